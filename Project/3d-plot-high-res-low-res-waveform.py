@@ -1,6 +1,6 @@
 from model import create_model
 from constants import *
-import tensorflow_datasets as tfds
+from WaveformCorpus import WaveformCorpus
 import numpy as np
 from metrics import *
 from tensorflow.keras.models import Model
@@ -21,21 +21,14 @@ model.load_weights(MODEL_PATH)
 
 # auxiliary_model = Model(inputs=model.inputs, outputs=model.outputs + [model.layers[1]])
 
-print("Loading the sample vocal recording from the VCTK dataset...")
-dataset = tfds.load("vctk", with_info=False)
-sample_array = None
-transcript = None
-recording_index = 0
+print("Loading the sample vocal recording from the VCTK index...")
+vctk_corpus = WaveformCorpus(VCTK_CORPUS_DIRECTORY)
 
 chosen_recording = random.randint(AMOUNT_OF_TRACKS_USED_FOR_DATA_GENERATION + 1, AMOUNT_OF_TRACKS_USED_FOR_DATA_GENERATION + 100)
 
-for sample in dataset['train']:
-    if recording_index == chosen_recording:
-        transcript = sample['text']
-        print("Recording transcript: {}".format(transcript))
-        sample_array = np.array(sample['speech'], dtype=float)
-        break
-    recording_index += 1
+transcript = vctk_corpus.get_transcript(chosen_recording)
+print("Recording transcript: {}".format(transcript))
+sample_array = vctk_corpus.get_track(chosen_recording)
 
 print("Downsampling the audio...")
 
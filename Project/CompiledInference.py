@@ -0,0 +1,45 @@
+import numpy as np
+import tensorflow as tf
+from constants import *
+
+
+class CompiledInference:
+    """
+    Runs a Keras model through a single tf.function traced for a fixed (batch_size, LOW_RESOLUTION_DIMENSION, 1)
+    float32 signature, optionally compiled with XLA. Unlike model.predict, a call does not set up a data adapter,
+    callbacks or a predict loop, and it never retraces. predict() keeps the model.predict interface, so it can be
+    used by inference.super_resolve, the StreamingSuperResolver and the MicroBatchScheduler.
+    """
+    def __init__(self, model, batch_size=BATCH_SIZE, jit_compile=INFERENCE_JIT_COMPILE):
+        self.__batch_size = batch_size
+        self.__function = tf.function(lambda input_batch: model(input_batch, training=False),
+                                      input_signature=[tf.TensorSpec((batch_size, LOW_RESOLUTION_DIMENSION, 1),
+                                                                     tf.float32)],
+                                      jit_compile=jit_compile)
+        self.warm_up()
+
+    def warm_up(self):
+        self.__function(tf.zeros((self.__batch_size, LOW_RESOLUTION_DIMENSION, 1), dtype=tf.float32))
+
+    def get_tracing_count(self):
+        return self.__function.experimental_get_tracing_count()
+
+    def predict(self, input_chunks, batch_size=None, verbose=0):
+        """
+        Accepts any number of chunks; only the last batch is zero-padded. batch_size is ignored, the batch size is
+        the one of the traced signature.
+        """
+        input_chunks = np.asarray(input_chunks, dtype=np.float32).reshape(-1, LOW_RESOLUTION_DIMENSION, 1)
+        output = np.empty((len(input_chunks), SAMPLE_DIMENSION, 1), dtype=np.float32)
+        number_of_full_batches = len(input_chunks) // self.__batch_size
+
+        for batch_start in range(0, number_of_full_batches * self.__batch_size, self.__batch_size):
+            output[batch_start:batch_start + self.__batch_size] = \
+                self.__function(input_chunks[batch_start:batch_start + self.__batch_size]).numpy()
+
+        remainder = input_chunks[number_of_full_batches * self.__batch_size:]
+        if len(remainder) > 0:
+            last_batch = np.zeros((self.__batch_size, LOW_RESOLUTION_DIMENSION, 1), dtype=np.float32)
+            last_batch[:len(remainder)] = remainder
+            output[number_of_full_batches * self.__batch_size:] = self.__function(last_batch).numpy()[:len(remainder)]
+        return output
@@ -1,4 +1,8 @@
-from multiprocessing import Process
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+import threading
+import hashlib
 import tensorflow_datasets as tfds
 from scipy import interpolate
 from constants import *
@@ -8,81 +12,314 @@ import numpy as np
 import datetime
 import os
 from scipy.interpolate import interp1d
+from ShardedDataset import ShardedDataset, run_shard_generation_task, cut_record_pairs
+from DatasetStatistics import DatasetStatistics
+from WaveformCorpus import WaveformCorpusWriter, WaveformCorpus, WindowedCorpusDataset
 
 
 class DatasetGenerator:
     def __init__(self):
-        self.__data = []
-        self.__process_list = []
+        self.__executor = None
+        self.__progress_lock = threading.Lock()
+        self.__number_of_tracks_done, self.__number_of_records_done = 0, 0
+        self.__number_of_tracks_loaded = 0
+        self.__shard_statistics = {}
+        self.__written_shard_names = []
         self.__start_time, self.__end_time = None, None
 
-    def run_generation_task(self, start_index, end_index, process_index, group_index):
-        for recording_index in range(start_index, end_index):
-            file_index = 0
-            sample_array = self.__data[recording_index]
-            sample_array_length = len(sample_array)
-            sample_array = sample_array[:sample_array_length - (sample_array_length % RESAMPLING_FACTOR)]
-
-            for sample_index in range(0, len(sample_array) - SAMPLE_DIMENSION, OVERLAP):
-                high_resolution_chunk = sample_array[sample_index:sample_index + SAMPLE_DIMENSION]
-                low_resolution_chunk = high_resolution_chunk[0::RESAMPLING_FACTOR]
-                high_resolution_chunk = np.reshape(high_resolution_chunk, (len(high_resolution_chunk), 1))
-                low_resolution_chunk = np.reshape(low_resolution_chunk, (len(low_resolution_chunk), 1))
-                filename = "recording_index_{}_sample_index_{}_group_index_{}" \
-                    .format(group_index*AMOUNT_OF_TRACKS_IN_A_DATA_GENERATION_BATCH+recording_index, sample_index, group_index)
-                print("Process {} generated the filepair no. {} from recording {} (group {})".format(
-                    process_index, file_index, group_index*AMOUNT_OF_TRACKS_IN_A_DATA_GENERATION_BATCH+recording_index, group_index))
-                np.save("preprocessed_dataset/low_res/lr_" + filename + "_length_" + str(LOW_RESOLUTION_DIMENSION), low_resolution_chunk)
-                np.save("preprocessed_dataset/high_res/hr_" + filename + "_length_" + str(SAMPLE_DIMENSION), high_resolution_chunk)
-                file_index += 1
-
-    def find_workload_interval(self, process_index):
-        return ((process_index * len(self.__data)) // NUMBER_OF_PROCESSES,
-                ((process_index + 1) * len(self.__data)) // NUMBER_OF_PROCESSES)
+    @staticmethod
+    def find_workload_intervals(track_lengths, number_of_workloads=NUMBER_OF_PROCESSES):
+        """
+        Splits a group of tracks into contiguous intervals holding roughly the same number of samples (a track goes to
+        the interval containing its midpoint), so that the workers get balanced workloads while the record order still
+        follows the track order.
+        """
+        track_lengths = np.asarray(track_lengths)
+        track_midpoints = np.cumsum(track_lengths) - track_lengths / 2
+        targets = track_lengths.sum() * np.arange(1, number_of_workloads) / number_of_workloads
+        boundaries = [0] + np.searchsorted(track_midpoints, targets).tolist() + [len(track_lengths)]
+        return [(boundaries[index], boundaries[index + 1]) for index in range(number_of_workloads)
+                if boundaries[index] < boundaries[index + 1]]
+
+    def report_progress(self, future):
+        shard_name, number_of_tracks, number_of_records, statistics = future.result()
+        with self.__progress_lock:
+            if statistics is not None:
+                self.__shard_statistics[shard_name] = statistics
+            if number_of_records > 0:
+                self.__written_shard_names.append(shard_name)
+            self.__number_of_tracks_done += number_of_tracks
+            self.__number_of_records_done += number_of_records
+            print("Progress: {}/{} loaded tracks processed, {} record pairs written".format(
+                self.__number_of_tracks_done, self.__number_of_tracks_loaded, self.__number_of_records_done))
+
+    def submit_group(self, tracks, group_index):
+        track_lengths = [len(track) for track in tracks]
+        shared_memory = SharedMemory(create=True, size=max(sum(track_lengths), 1) * np.dtype(np.int16).itemsize)
+        samples = np.ndarray((sum(track_lengths),), dtype=np.int16, buffer=shared_memory.buf)
+        offsets = np.concatenate([[0], np.cumsum(track_lengths)[:-1]])
+        for track, offset in zip(tracks, offsets):
+            samples[offset:offset + len(track)] = track
+        del samples
+
+        first_track_index = group_index * AMOUNT_OF_TRACKS_IN_A_DATA_GENERATION_BATCH
+        futures = []
+        for workload_index, (start_index, end_index) in enumerate(self.find_workload_intervals(track_lengths)):
+            workload = [(first_track_index + track_index, int(offsets[track_index]), track_lengths[track_index])
+                        for track_index in range(start_index, end_index)]
+            shard_name = "shard_group_{:04d}_part_{:02d}".format(group_index, workload_index)
+            future = self.__executor.submit(run_shard_generation_task, shared_memory.name, sum(track_lengths),
+                                            workload, shard_name, SHARDED_DATASET_DIRECTORY)
+            future.add_done_callback(self.report_progress)
+            futures.append(future)
+        return shared_memory, futures
+
+    def flush_group(self, tracks, group_index, previous_group):
+        with self.__progress_lock:
+            self.__number_of_tracks_loaded += len(tracks)
+        group = self.submit_group(tracks, group_index)
+        if previous_group is not None:
+            self.release_group(*previous_group)
+        return group
+
+    @staticmethod
+    def release_group(shared_memory, futures):
+        try:
+            for future in futures:
+                future.result()
+        finally:
+            shared_memory.close()
+            shared_memory.unlink()
 
     def generate_dataset(self):
         self.__start_time = datetime.datetime.now()
+        os.makedirs(SHARDED_DATASET_DIRECTORY, exist_ok=True)
+        # Until this run has written all of its shards, the directory holds no valid dataset.
+        manifest_path = os.path.join(SHARDED_DATASET_DIRECTORY, SHARD_MANIFEST_FILENAME)
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+        self.__written_shard_names = []
         print("Data generation started at {}".format(self.__start_time.strftime("%Y-%m-%d %H:%M:%S")))
 
         dataset = tfds.load("vctk", with_info=False)
         dataset = dataset['train'].take(AMOUNT_OF_TRACKS_USED_FOR_DATA_GENERATION)
-        sample_index, tracks_processing_batch_index = 0, 0
+        tracks, group_index, previous_group = [], 0, None
 
-        for sample in dataset:
-            print("Adding sample no. {} to the list...".format(sample_index))
-            self.__data.append(np.array(sample['speech'], dtype=np.float))
-            sample_index += 1
-            if sample_index % AMOUNT_OF_TRACKS_IN_A_DATA_GENERATION_BATCH == 0:
-                for process_index in range(0, NUMBER_OF_PROCESSES):
-                    workload_interval = self.find_workload_interval(process_index)
-                    process = Process(target=self.run_generation_task,
-                                      args=(workload_interval[0], workload_interval[1], process_index, tracks_processing_batch_index))
-                    process.start()
-                    self.__process_list.append(process)
-
-                for process in self.__process_list:
-                    process.join()
-
-                self.__data = []
-                self.__process_list = []
-                tracks_processing_batch_index += 1
+        # The tracks of the next group are read from tfds while the workers are still busy with the current one,
+        # so at most two groups are held in shared memory at any time.
+        self.__executor = ProcessPoolExecutor(max_workers=NUMBER_OF_PROCESSES, mp_context=get_context("spawn"))
+        try:
+            for sample in dataset:
+                tracks.append(np.asarray(sample['speech'], dtype=np.int16))
+                if len(tracks) == AMOUNT_OF_TRACKS_IN_A_DATA_GENERATION_BATCH:
+                    previous_group = self.flush_group(tracks, group_index, previous_group)
+                    tracks, group_index = [], group_index + 1
+            if len(tracks) > 0:
+                previous_group = self.flush_group(tracks, group_index, previous_group)
+            if previous_group is not None:
+                self.release_group(*previous_group)
+        finally:
+            self.__executor.shutdown()
+            self.__executor = None
+
+        # Only the shards written by this run make up the dataset; the files left over by earlier runs are removed.
+        manifest = ShardedDataset.write_manifest(self.__written_shard_names, SHARDED_DATASET_DIRECTORY)
+        for filename in os.listdir(SHARDED_DATASET_DIRECTORY):
+            for suffix in ("_low_res.npy", "_high_res.npy", "_index.npy"):
+                if filename.endswith(suffix) and filename[:-len(suffix)] not in self.__written_shard_names:
+                    os.remove(os.path.join(SHARDED_DATASET_DIRECTORY, filename))
+        print("Wrote {} record pairs in {} shards.".format(manifest["number_of_records"], len(manifest["shards"])))
+        sharded_dataset = ShardedDataset(SHARDED_DATASET_DIRECTORY)
+        group_statistics = [(shard_start, shard_start + len(high_resolution_records),
+                             self.__shard_statistics.get(shard["name"]))
+                            for shard, (shard_start, _, high_resolution_records, _)
+                            in zip(manifest["shards"], sharded_dataset.get_shards())]
+        DatasetStatistics.save_split_summaries(self.compute_split_statistics(group_statistics, sharded_dataset),
+                                               manifest["number_of_records"], DATASET_STATISTICS_PATH)
+        print("Saved the dataset statistics to {}".format(DATASET_STATISTICS_PATH))
 
         self.__end_time = datetime.datetime.now()
         print("Data generation started at {}".format(self.__start_time.strftime("%Y-%m-%d %H:%M:%S")))
         print("Data generation ended at {}".format(self.__end_time.strftime("%Y-%m-%d %H:%M:%S")))
 
+    @staticmethod
+    def compute_split_statistics(group_statistics, dataset):
+        """
+        Merges the statistics collected during the generation for groups of records, [(start, stop, statistics)],
+        into per-split statistics. Only a group that straddles a split boundary (or has no statistics) is read again
+        from the dataset, RECORDS_PER_READ records at a time.
+        """
+        split_names = ("training", "validation", "testing")
+        split_ranges = DatasetGenerator.split_records(len(dataset))
+        split_statistics = {split_name: DatasetStatistics() for split_name in split_names}
+
+        for group_start, group_stop, statistics in group_statistics:
+            for split_name, (split_start, split_stop) in zip(split_names, split_ranges):
+                if split_start <= group_start and group_stop <= split_stop and statistics is not None:
+                    split_statistics[split_name].merge(statistics)
+                    continue
+                for block_start in range(max(split_start, group_start), min(split_stop, group_stop), RECORDS_PER_READ):
+                    block_stop = min(block_start + RECORDS_PER_READ, split_stop, group_stop)
+                    split_statistics[split_name].update(dataset.read(block_start, block_stop)[1])
+        return split_statistics
+
     @staticmethod
     def split_list_of_files():
         low_resolution_files = np.sort(np.array(os.listdir("preprocessed_dataset/low_res")))
         high_resolution_files = np.sort(np.array(os.listdir("preprocessed_dataset/high_res")))
-        training_set = (low_resolution_files[:NUMBER_OF_TRAINING_TENSORS],
-                        high_resolution_files[:NUMBER_OF_TRAINING_TENSORS])
-        validation_set = (low_resolution_files[NUMBER_OF_TRAINING_TENSORS:NUMBER_OF_TRAINING_TENSORS+NUMBER_OF_VALIDATION_TENSORS],
-                          high_resolution_files[NUMBER_OF_TRAINING_TENSORS:NUMBER_OF_TRAINING_TENSORS+NUMBER_OF_VALIDATION_TENSORS])
-        testing_set = (low_resolution_files[NUMBER_OF_TRAINING_TENSORS+NUMBER_OF_VALIDATION_TENSORS:],
-                       high_resolution_files[NUMBER_OF_TRAINING_TENSORS+NUMBER_OF_VALIDATION_TENSORS:])
+        number_of_training_tensors = get_number_of_training_tensors()
+        number_of_validation_tensors = get_number_of_validation_tensors()
+        training_set = (low_resolution_files[:number_of_training_tensors],
+                        high_resolution_files[:number_of_training_tensors])
+        validation_set = (low_resolution_files[number_of_training_tensors:number_of_training_tensors+number_of_validation_tensors],
+                          high_resolution_files[number_of_training_tensors:number_of_training_tensors+number_of_validation_tensors])
+        testing_set = (low_resolution_files[number_of_training_tensors+number_of_validation_tensors:],
+                       high_resolution_files[number_of_training_tensors+number_of_validation_tensors:])
+        return training_set, validation_set, testing_set
+
+    @staticmethod
+    def split_records(number_of_records=None):
+        if number_of_records is None:
+            number_of_records = get_number_of_files()
+        number_of_training_records = int(TRAINING_DATA_SPLIT_PERCENTAGE * number_of_records)
+        number_of_validation_records = int(VALIDATION_DATA_SPLIT_PERCENTAGE * number_of_records)
+        training_set = (0, number_of_training_records)
+        validation_set = (number_of_training_records, number_of_training_records+number_of_validation_records)
+        testing_set = (number_of_training_records+number_of_validation_records, number_of_records)
         return training_set, validation_set, testing_set
 
+    def generate_waveform_corpus(self):
+        self.__start_time = datetime.datetime.now()
+        print("Waveform corpus generation started at {}".format(self.__start_time.strftime("%Y-%m-%d %H:%M:%S")))
+
+        dataset = tfds.load("vctk", with_info=False)
+        dataset = dataset['train'].take(AMOUNT_OF_TRACKS_USED_FOR_DATA_GENERATION)
+        corpus_writer = WaveformCorpusWriter(WAVEFORM_CORPUS_DIRECTORY)
+        # The statistics of the records the tracks will be cut into are collected while the tracks are written, per
+        # group of tracks, as the shard workers do; only the groups on a split boundary are read again at the end.
+        group_statistics, number_of_records = [], 0
+        for sample in dataset:
+            sample_array = np.array(sample['speech'], dtype=np.int16)
+            track_index = corpus_writer.write_track(sample_array)
+            if track_index % AMOUNT_OF_TRACKS_IN_A_STATISTICS_GROUP == 0:
+                group_statistics.append([number_of_records, number_of_records, DatasetStatistics()])
+            high_resolution_records = cut_record_pairs(sample_array)[1]
+            group_statistics[-1][2].update(high_resolution_records)
+            number_of_records += len(high_resolution_records)
+            group_statistics[-1][1] = number_of_records
+            print("Added recording {} to the waveform corpus".format(track_index))
+        corpus_writer.close()
+
+        windowed_dataset = WindowedCorpusDataset(WaveformCorpus(WAVEFORM_CORPUS_DIRECTORY),
+                                                 AMOUNT_OF_TRACKS_USED_FOR_DATA_GENERATION)
+        DatasetStatistics.save_split_summaries(self.compute_split_statistics(group_statistics, windowed_dataset),
+                                               len(windowed_dataset), DATASET_STATISTICS_PATH)
+        print("Saved the dataset statistics to {}".format(DATASET_STATISTICS_PATH))
+
+        self.__end_time = datetime.datetime.now()
+        print("Waveform corpus generation ended at {}".format(self.__end_time.strftime("%Y-%m-%d %H:%M:%S")))
+
+    def index_vctk(self):
+        """
+        Extracts every VCTK recording, with its speaker and transcript, into a waveform corpus so that the scripts
+        and the app can fetch any recording directly instead of decoding the dataset up to it.
+        """
+        self.__start_time = datetime.datetime.now()
+        print("VCTK indexing started at {}".format(self.__start_time.strftime("%Y-%m-%d %H:%M:%S")))
+
+        dataset, dataset_info = tfds.load("vctk", with_info=True)
+        speaker_names = dataset_info.features['speaker']
+        corpus_writer = WaveformCorpusWriter(VCTK_CORPUS_DIRECTORY)
+        for sample in tfds.as_numpy(dataset['train']):
+            track_index = corpus_writer.write_track(np.array(sample['speech'], dtype=np.int16),
+                                                    speaker=speaker_names.int2str(int(sample['speaker'])),
+                                                    transcript=sample['text'].decode("utf-8"))
+            if track_index % 1000 == 0:
+                print("Indexed {} recordings".format(track_index + 1))
+        number_of_tracks = corpus_writer.close()
+
+        self.__end_time = datetime.datetime.now()
+        print("Indexed {} recordings into {}".format(number_of_tracks, VCTK_CORPUS_DIRECTORY))
+        print("VCTK indexing ended at {}".format(self.__end_time.strftime("%Y-%m-%d %H:%M:%S")))
+
+    @staticmethod
+    def open_dataset():
+        if PAIR_GENERATION_MODE == "on_the_fly":
+            return WindowedCorpusDataset(WaveformCorpus(WAVEFORM_CORPUS_DIRECTORY), AMOUNT_OF_TRACKS_USED_FOR_DATA_GENERATION)
+        return ShardedDataset(SHARDED_DATASET_DIRECTORY)
+
+    @staticmethod
+    def get_cache_filename(cache_filename, start, stop):
+        """
+        Suffixes cache_filename with a fingerprint of the dataset (its shard manifest or its corpus track table), of
+        the record range and of the pair dimensions, and removes the caches left under the same name by another
+        fingerprint.
+        """
+        fingerprint = hashlib.sha256()
+        if PAIR_GENERATION_MODE == "on_the_fly":
+            dataset_description_path = os.path.join(WAVEFORM_CORPUS_DIRECTORY, WAVEFORM_CORPUS_TRACKS_FILENAME)
+        else:
+            dataset_description_path = os.path.join(SHARDED_DATASET_DIRECTORY, SHARD_MANIFEST_FILENAME)
+        with open(dataset_description_path, "rb") as dataset_description_file:
+            fingerprint.update(dataset_description_file.read())
+        fingerprint.update(repr((PAIR_GENERATION_MODE, int(start), int(stop), SAMPLE_DIMENSION, OVERLAP,
+                                 RESAMPLING_FACTOR)).encode())
+        fingerprinted_filename = "{}-{}".format(cache_filename, fingerprint.hexdigest()[:16])
+
+        cache_directory, cache_name = os.path.split(cache_filename)
+        if os.path.isdir(cache_directory or "."):
+            for filename in os.listdir(cache_directory or "."):
+                if filename.startswith(cache_name + "-") \
+                        and not filename.startswith(os.path.basename(fingerprinted_filename)):
+                    os.remove(os.path.join(cache_directory, filename))
+        return fingerprinted_filename
+
+    @staticmethod
+    def create_input_pipeline(start, stop, shuffle=True, cache_filename=None, dataset=None):
+        """
+        Streams the records [start, stop) of the dataset (DatasetGenerator.open_dataset() by default) as float32
+        (low-res, high-res) batches. Blocks of RECORDS_PER_READ records are read in a new random order every epoch
+        by parallel interleaved readers, optionally cached as int16 (no cache if cache_filename is None, in memory if
+        it is empty), shuffled through a bounded buffer and prefetched. A cache replays the block order of its first
+        epoch, only the record buffer reshuffles after it. A file cache is tied to the dataset, the record range and the dimensions
+        (see get_cache_filename), so a regenerated or resplit dataset is never read from a stale cache.
+        """
+        records = dataset if dataset is not None else DatasetGenerator.open_dataset()
+        if cache_filename is not None and cache_filename != "":
+            cache_filename = DatasetGenerator.get_cache_filename(cache_filename, start, stop)
+        blocks = np.array([(block_start, min(block_start + RECORDS_PER_READ, stop))
+                           for block_start in range(start, stop, RECORDS_PER_READ)], dtype=np.int64).reshape(-1, 2)
+
+        def read_block(block_start, block_stop):
+            low_resolution_records, high_resolution_records, _ = records.read(block_start, block_stop)
+            return np.asarray(low_resolution_records), np.asarray(high_resolution_records)
+
+        def create_block_dataset(block):
+            low_resolution_records, high_resolution_records = tf.numpy_function(
+                read_block, [block[0], block[1]], [tf.int16, tf.int16])
+            low_resolution_records = tf.ensure_shape(low_resolution_records, [None, LOW_RESOLUTION_DIMENSION, 1])
+            high_resolution_records = tf.ensure_shape(high_resolution_records, [None, SAMPLE_DIMENSION, 1])
+            return tf.data.Dataset.from_tensor_slices((low_resolution_records, high_resolution_records))
+
+        dataset = tf.data.Dataset.from_tensor_slices(blocks)
+        if shuffle:
+            # The blocks are consecutive records of the same tracks, the record buffer alone only mixes neighbours.
+            dataset = dataset.shuffle(len(blocks), reshuffle_each_iteration=True)
+        dataset = dataset.interleave(create_block_dataset, cycle_length=NUMBER_OF_PARALLEL_READS,
+                                     num_parallel_calls=tf.data.AUTOTUNE)
+        if cache_filename == "":
+            dataset = dataset.cache()
+        elif cache_filename is not None:
+            os.makedirs(os.path.dirname(cache_filename), exist_ok=True)
+            dataset = dataset.cache(cache_filename)
+        if shuffle:
+            dataset = dataset.shuffle(SHUFFLE_BUFFER_SIZE, reshuffle_each_iteration=True)
+        dataset = dataset.batch(BATCH_SIZE, drop_remainder=True)
+        dataset = dataset.map(lambda low_resolution_batch, high_resolution_batch:
+                              (tf.cast(low_resolution_batch, tf.float32), tf.cast(high_resolution_batch, tf.float32)),
+                              num_parallel_calls=tf.data.AUTOTUNE)
+        return dataset.prefetch(tf.data.AUTOTUNE)
+
     @staticmethod
     def upsample(low_resolution_array, resampling_factor):
         low_resolution_array = low_resolution_array.flatten()
@@ -0,0 +1,131 @@
+import functools
+import json
+import os
+import warnings
+import numpy as np
+from constants import *
+
+NUMBER_OF_INT16_VALUES = 1 << 16
+
+
+class DatasetStatistics:
+    """
+    Single-pass, mergeable statistics of int16 samples. The moments use Welford's algorithm (combined batch by batch
+    with Chan's formula) and the quantiles come from a histogram over the 65536 possible int16 values, which is both
+    mergeable and exact, so the collectors of different worker processes can be combined at the end.
+    """
+    def __init__(self):
+        self.__count = 0
+        self.__mean = 0.0
+        self.__sum_of_squared_deviations = 0.0
+        self.__histogram = np.zeros(NUMBER_OF_INT16_VALUES, dtype=np.int64)
+
+    def __len__(self):
+        return self.__count
+
+    def update(self, samples):
+        samples = np.asarray(samples, dtype=np.int16).reshape(-1)
+        if len(samples) == 0:
+            return
+        batch_mean = samples.mean(dtype=np.float64)
+        deviations = samples - batch_mean
+        batch_statistics = DatasetStatistics()
+        batch_statistics.__count = len(samples)
+        batch_statistics.__mean = batch_mean
+        batch_statistics.__sum_of_squared_deviations = float(np.dot(deviations, deviations))
+        batch_statistics.__histogram = np.bincount(samples.astype(np.int64) - MINIMUM, minlength=NUMBER_OF_INT16_VALUES)
+        self.merge(batch_statistics)
+
+    def merge(self, other):
+        count = self.__count + other.__count
+        if count == 0:
+            return self
+        delta = other.__mean - self.__mean
+        self.__mean += delta * other.__count / count
+        self.__sum_of_squared_deviations += other.__sum_of_squared_deviations \
+            + delta ** 2 * self.__count * other.__count / count
+        self.__count = count
+        self.__histogram += other.__histogram
+        return self
+
+    def quantile(self, q):
+        """
+        Same value as np.quantile(samples, q) with linear interpolation.
+        """
+        cumulative_histogram = np.cumsum(self.__histogram)
+        rank = q * (self.__count - 1)
+        lower_value = np.searchsorted(cumulative_histogram, np.floor(rank), side="right") + MINIMUM
+        upper_value = np.searchsorted(cumulative_histogram, np.ceil(rank), side="right") + MINIMUM
+        return float(lower_value + (upper_value - lower_value) * (rank - np.floor(rank)))
+
+    def summarise(self):
+        occupied_values = np.flatnonzero(self.__histogram)
+        return {
+            "count": self.__count,
+            "mean": self.__mean,
+            "std": float(np.sqrt(self.__sum_of_squared_deviations / self.__count)),
+            "min": int(occupied_values[0]) + MINIMUM,
+            "max": int(occupied_values[-1]) + MINIMUM,
+            "first_quantile": self.quantile(0.25),
+            "second_quantile": self.quantile(0.5),
+            "third_quantile": self.quantile(0.75)
+        }
+
+    @staticmethod
+    def save_split_summaries(split_statistics, number_of_records, path=DATASET_STATISTICS_PATH):
+        """
+        Writes the summaries along with the generation mode and the number of records they were computed on, so
+        that they are never applied to another dataset.
+        """
+        with open(path, "w") as statistics_file:
+            json.dump({
+                "generation_mode": PAIR_GENERATION_MODE,
+                "number_of_records": number_of_records,
+                "splits": {split: statistics.summarise() for split, statistics in split_statistics.items()
+                           if len(statistics) > 0}
+            }, statistics_file, indent=4)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def get_interquartile_ranges():
+        """
+        load_interquartile_ranges(), read once on the first NRMSE computed rather than when the metrics are imported.
+        """
+        return DatasetStatistics.load_interquartile_ranges()
+
+    @staticmethod
+    def load_interquartile_ranges(path=DATASET_STATISTICS_PATH, number_of_records=None):
+        """
+        Interquartile range of every split, read from the statistics file written during the dataset generation.
+        A file written for another generation mode or another number of records is rejected. When the file or a
+        split is missing, the TRAINING/VALIDATION/TESTING_SET_* constants of the original dataset are used, with a
+        warning.
+        """
+        if number_of_records is None:
+            number_of_records = get_number_of_files()
+        interquartile_ranges = {}
+        if os.path.exists(path):
+            with open(path) as statistics_file:
+                statistics = json.load(statistics_file)
+            if statistics.get("generation_mode") != PAIR_GENERATION_MODE \
+                    or statistics.get("number_of_records") != number_of_records:
+                raise ValueError("{} was computed on {} records in {} mode, but the dataset has {} records in {} mode. "
+                                 "Regenerate the dataset to refresh the statistics.".format(
+                                     path, statistics.get("number_of_records"), statistics.get("generation_mode"),
+                                     number_of_records, PAIR_GENERATION_MODE))
+            for split, summary in statistics["splits"].items():
+                interquartile_ranges[split] = summary["third_quantile"] - summary["first_quantile"]
+
+        default_interquartile_ranges = {
+            "training": TRAINING_SET_THIRD_QUANTILE - TRAINING_SET_FIRST_QUANTILE,
+            "validation": VALIDATION_SET_THIRD_QUANTILE - VALIDATION_SET_FIRST_QUANTILE,
+            "testing": TESTING_SET_THIRD_QUANTILE - TESTING_SET_FIRST_QUANTILE
+        }
+        missing_splits = [split for split in default_interquartile_ranges if split not in interquartile_ranges]
+        if len(missing_splits) > 0:
+            warnings.warn("No statistics for the {} split(s) in {}: the NRMSE metrics fall back on the hard-coded "
+                          "quantiles of the original dataset, which are wrong for any other dataset.".format(
+                              ", ".join(missing_splits), path))
+            for split in missing_splits:
+                interquartile_ranges[split] = default_interquartile_ranges[split]
+        return interquartile_ranges
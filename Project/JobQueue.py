@@ -0,0 +1,122 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from constants import *
+
+
+class JobQueueFullError(Exception):
+    pass
+
+
+class JobQueue:
+    """
+    Runs long super-resolution jobs on a bounded pool of worker threads. At most number_of_workers jobs run at once
+    and at most max_queued_jobs wait behind them; submit() refuses any further job instead of letting a burst pile up
+    in front of the model. Every job reports its progress in chunks through a callback, and the results of finished
+    jobs are kept for result_time_to_live seconds, the oldest ones being dropped earlier once the stored results
+    exceed result_byte_budget bytes.
+    """
+    def __init__(self, process_job, number_of_workers=NUMBER_OF_JOB_WORKERS, max_queued_jobs=MAX_QUEUED_JOBS,
+                 result_time_to_live=JOB_RESULT_TIME_TO_LIVE, result_byte_budget=JOB_RESULT_BYTE_BUDGET):
+        self.__process_job = process_job
+        self.__result_time_to_live = result_time_to_live
+        self.__result_byte_budget = result_byte_budget
+        self.__number_of_bytes = 0
+        self.__executor = ThreadPoolExecutor(max_workers=number_of_workers)
+        self.__slots = threading.BoundedSemaphore(number_of_workers + max_queued_jobs)
+        self.__jobs = {}
+        self.__lock = threading.Lock()
+
+    def submit(self, *arguments):
+        """
+        Queues process_job(report_progress, *arguments) and returns the id of the job. Raises JobQueueFullError when
+        the queue is full.
+        """
+        self.remove_expired_jobs()
+        if not self.__slots.acquire(blocking=False):
+            raise JobQueueFullError("Too many jobs are queued, try again later.")
+        job_id = uuid.uuid4().hex
+        with self.__lock:
+            self.__jobs[job_id] = {
+                "status": "queued",
+                "chunks_done": 0,
+                "total_chunks": None,
+                "result": None,
+                "error": None,
+                "submitted_at": time.time(),
+                "finished_at": None
+            }
+        self.__executor.submit(self.run_job, job_id, arguments)
+        return job_id
+
+    def run_job(self, job_id, arguments):
+        def report_progress(chunks_done, total_chunks):
+            with self.__lock:
+                self.__jobs[job_id]["chunks_done"] = chunks_done
+                self.__jobs[job_id]["total_chunks"] = total_chunks
+
+        with self.__lock:
+            self.__jobs[job_id]["status"] = "running"
+        try:
+            result = self.__process_job(report_progress, *arguments)
+            if len(result) > self.__result_byte_budget:
+                raise ValueError("The result ({} bytes) is larger than the job result budget.".format(len(result)))
+            with self.__lock:
+                self.__jobs[job_id].update(status="done", result=result, finished_at=time.time())
+                self.__number_of_bytes += len(result)
+                self.remove_oldest_results()
+        except Exception as exception:
+            print("Job {} failed: {}".format(job_id, exception))
+            with self.__lock:
+                self.__jobs[job_id].update(status="failed", error=str(exception), finished_at=time.time())
+        finally:
+            self.__slots.release()
+
+    def get_status(self, job_id):
+        self.remove_expired_jobs()
+        with self.__lock:
+            job = self.__jobs.get(job_id)
+            if job is None:
+                return None
+            return {key: value for key, value in job.items() if key != "result"}
+
+    def get_result(self, job_id):
+        self.remove_expired_jobs()
+        with self.__lock:
+            job = self.__jobs.get(job_id)
+            return job["result"] if job is not None else None
+
+    def remove_expired_jobs(self):
+        expiry_time = time.time() - self.__result_time_to_live
+        with self.__lock:
+            for job_id in [job_id for job_id, job in self.__jobs.items()
+                           if job["finished_at"] is not None and job["finished_at"] < expiry_time]:
+                self.remove_job(job_id)
+
+    def remove_oldest_results(self):
+        """
+        Removes the jobs that finished first until their results fit in the byte budget; must be called with the
+        lock held.
+        """
+        if self.__number_of_bytes <= self.__result_byte_budget:
+            return
+        finished_jobs = sorted((job["finished_at"], job_id) for job_id, job in self.__jobs.items()
+                               if job["result"] is not None)
+        for _, job_id in finished_jobs:
+            if self.__number_of_bytes <= self.__result_byte_budget:
+                break
+            self.remove_job(job_id)
+
+    def remove_job(self, job_id):
+        job = self.__jobs.pop(job_id)
+        if job["result"] is not None:
+            self.__number_of_bytes -= len(job["result"])
+
+    def status(self):
+        with self.__lock:
+            statuses = [job["status"] for job in self.__jobs.values()]
+            number_of_bytes = self.__number_of_bytes
+        status = {status: statuses.count(status) for status in ("queued", "running", "done", "failed")}
+        status["result_bytes"] = number_of_bytes
+        return status
@@ -0,0 +1,170 @@
+import functools
+import threading
+import time
+import types
+from collections import deque
+import numpy as np
+from constants import *
+
+
+class MicroBatchScheduler:
+    """
+    Shares the fixed-size batches of the network between concurrent requests. Every request hands its low-res
+    chunks to predict(), which queues them and blocks; a single scheduler thread packs the queued chunks of all the
+    requests into batches and dispatches them as soon as a batch is full, or once the oldest queued chunk has waited
+    max_wait seconds. The predictions are scattered back into the output buffer of the request they belong to.
+    """
+    def __init__(self, model_registry, batch_size=BATCH_SIZE, max_wait=MICRO_BATCH_MAX_WAIT,
+                 max_batches_per_dispatch=NUMBER_OF_BATCHES_PER_PREDICTION):
+        self.__model_registry = model_registry
+        self.__batch_size = batch_size
+        self.__max_wait = max_wait
+        self.__max_batches_per_dispatch = max_batches_per_dispatch
+        self.__queue = deque()
+        self.__number_of_queued_chunks = 0
+        self.__condition = threading.Condition()
+        self.__stopped = False
+        self.__scheduler = None
+        self.__number_of_dispatched_batches = 0
+        self.__number_of_dispatched_chunks = 0
+
+    def start(self):
+        if self.__scheduler is not None:
+            return
+        self.__scheduler = threading.Thread(target=self.run_scheduler, daemon=True)
+        self.__scheduler.start()
+
+    def stop(self):
+        with self.__condition:
+            self.__stopped = True
+            self.__condition.notify_all()
+
+    def for_model(self, model):
+        """
+        Same interface as the scheduler, but the chunks always run on model (e.g. the one a cache key was built for),
+        even when the registry hot-swaps the weights while they are queued.
+        """
+        return types.SimpleNamespace(predict=functools.partial(self.predict, model=model))
+
+    def predict(self, input_chunks, batch_size=None, verbose=0, model=None):
+        """
+        Same interface as model.predict, so that the scheduler can be passed to inference.super_resolve. Any number of
+        chunks is accepted: the batches are padded by the scheduler, across requests, and batch_size is ignored. The
+        chunks run on model, or on the model served by the registry at dispatch time when it is None.
+        """
+        input_chunks = np.asarray(input_chunks, dtype=np.float32).reshape(-1, LOW_RESOLUTION_DIMENSION, 1)
+        scheduled_request = {
+            "chunks": input_chunks,
+            "output": np.empty((len(input_chunks), SAMPLE_DIMENSION, 1), dtype=np.float32),
+            "remaining": len(input_chunks),
+            "model": model,
+            "done": threading.Event(),
+            "error": None
+        }
+        if len(input_chunks) == 0:
+            return scheduled_request["output"]
+
+        with self.__condition:
+            if self.__stopped:
+                raise RuntimeError("The micro-batch scheduler has been stopped.")
+            self.__queue.append([scheduled_request, 0, time.monotonic()])
+            self.__number_of_queued_chunks += len(input_chunks)
+            self.__condition.notify_all()
+
+        scheduled_request["done"].wait()
+        if scheduled_request["error"] is not None:
+            raise scheduled_request["error"]
+        return scheduled_request["output"]
+
+    def run_scheduler(self):
+        while True:
+            with self.__condition:
+                while not self.__stopped and self.__number_of_queued_chunks == 0:
+                    self.__condition.wait()
+                if self.__stopped:
+                    break
+                # The oldest queued chunk sets the deadline; new requests may fill up the batch in the meantime.
+                deadline = self.__queue[0][2] + self.__max_wait
+                while not self.__stopped and self.__number_of_queued_chunks < self.__batch_size:
+                    remaining_time = deadline - time.monotonic()
+                    if remaining_time <= 0:
+                        break
+                    self.__condition.wait(remaining_time)
+                if self.__stopped:
+                    break
+                segments = self.take_chunks()
+            self.dispatch(segments)
+
+        with self.__condition:
+            for scheduled_request, _, _ in self.__queue:
+                scheduled_request["error"] = RuntimeError("The micro-batch scheduler has been stopped.")
+                scheduled_request["done"].set()
+            self.__queue.clear()
+            self.__number_of_queued_chunks = 0
+
+    def take_chunks(self):
+        """
+        Pops as many whole batches as are queued (at least one, possibly partial), up to max_batches_per_dispatch,
+        from the requests at the head of the queue that run on the same model. Returns (request, first_chunk,
+        last_chunk) segments; must be called with the condition held.
+        """
+        number_of_batches = min(max(self.__number_of_queued_chunks // self.__batch_size, 1),
+                                self.__max_batches_per_dispatch)
+        number_of_chunks = min(number_of_batches * self.__batch_size, self.__number_of_queued_chunks)
+        segments = []
+        model = self.__queue[0][0]["model"]
+        while number_of_chunks > 0 and len(self.__queue) > 0 and self.__queue[0][0]["model"] is model:
+            queued_segment = self.__queue[0]
+            scheduled_request, first_chunk, _ = queued_segment
+            last_chunk = min(first_chunk + number_of_chunks, len(scheduled_request["chunks"]))
+            segments.append((scheduled_request, first_chunk, last_chunk))
+            number_of_chunks -= last_chunk - first_chunk
+            self.__number_of_queued_chunks -= last_chunk - first_chunk
+            if last_chunk == len(scheduled_request["chunks"]):
+                self.__queue.popleft()
+            else:
+                queued_segment[1] = last_chunk
+        return segments
+
+    def dispatch(self, segments):
+        number_of_chunks = sum(last_chunk - first_chunk for _, first_chunk, last_chunk in segments)
+        number_of_batches = -(-number_of_chunks // self.__batch_size)
+        batch = np.zeros((number_of_batches * self.__batch_size, LOW_RESOLUTION_DIMENSION, 1), dtype=np.float32)
+        position = 0
+        for scheduled_request, first_chunk, last_chunk in segments:
+            batch[position:position + last_chunk - first_chunk] = scheduled_request["chunks"][first_chunk:last_chunk]
+            position += last_chunk - first_chunk
+
+        try:
+            model = segments[0][0]["model"]
+            if model is None:
+                model = self.__model_registry.get_model(timeout=MODEL_LOADING_TIMEOUT)
+            prediction = model.predict(batch, batch_size=self.__batch_size, verbose=0)
+            prediction = np.asarray(prediction).reshape(-1, SAMPLE_DIMENSION, 1)
+        except Exception as exception:
+            for scheduled_request, _, _ in segments:
+                scheduled_request["error"] = exception
+                scheduled_request["done"].set()
+            return
+
+        position = 0
+        with self.__condition:
+            self.__number_of_dispatched_batches += number_of_batches
+            self.__number_of_dispatched_chunks += number_of_chunks
+            for scheduled_request, first_chunk, last_chunk in segments:
+                scheduled_request["output"][first_chunk:last_chunk] = \
+                    prediction[position:position + last_chunk - first_chunk]
+                position += last_chunk - first_chunk
+                scheduled_request["remaining"] -= last_chunk - first_chunk
+                if scheduled_request["remaining"] == 0:
+                    scheduled_request["done"].set()
+
+    def status(self):
+        with self.__condition:
+            number_of_slots = self.__number_of_dispatched_batches * self.__batch_size
+            return {
+                "queued_chunks": self.__number_of_queued_chunks,
+                "dispatched_batches": self.__number_of_dispatched_batches,
+                "dispatched_chunks": self.__number_of_dispatched_chunks,
+                "batch_fill_ratio": self.__number_of_dispatched_chunks / number_of_slots if number_of_slots > 0 else None
+            }
@@ -0,0 +1,180 @@
+import threading
+import datetime
+import os
+import numpy as np
+from constants import *
+
+
+class ModelRegistry:
+    """
+    Keeps a single, warmed-up instance of the network per process so that requests never pay for building the
+    graph or reading the weights. A watcher thread loads the initial weights and then polls the models directory,
+    hot-swapping the network whenever an .h5 file is added or rewritten there after startup. With a TFLite backend,
+    the served file is the .tflite model exported by export_tflite.py, and only that file is watched.
+    """
+    def __init__(self, weights_path=None, models_directory=MODELS_DIRECTORY,
+                 poll_interval=MODEL_RELOAD_POLL_INTERVAL, inference_backend=INFERENCE_BACKEND):
+        if weights_path is None:
+            weights_path = self.get_tflite_model_path(inference_backend) \
+                if self.is_tflite_backend(inference_backend) else MODEL_PATH
+        self.__weights_path = weights_path
+        self.__inference_backend = inference_backend
+        self.__models_directory = models_directory
+        self.__poll_interval = poll_interval
+        self.__model = None
+        self.__loaded_weights = None
+        self.__loaded_at = None
+        self.__lock = threading.Lock()
+        self.__ready = threading.Event()
+        self.__stopped = threading.Event()
+        self.__watcher = None
+
+    def start(self):
+        if self.__watcher is not None:
+            return
+        self.__watcher = threading.Thread(target=self.run_watcher, daemon=True)
+        self.__watcher.start()
+
+    def stop(self):
+        self.__stopped.set()
+
+    def run_watcher(self):
+        # The .h5 files already in the directory are older checkpoints, not updates: only the files that appear or
+        # change after startup may replace the pinned weights.
+        ignored_weights = self.scan_weights()
+        try:
+            self.load(self.__weights_path)
+        except Exception as exception:
+            print("Could not load the weights from {}: {}".format(self.__weights_path, exception))
+        candidate = None
+        while not self.__stopped.wait(self.__poll_interval):
+            latest_weights = self.find_latest_weights(ignored_weights)
+            if latest_weights is None or latest_weights == self.__loaded_weights:
+                candidate = None
+                continue
+            # A file that is still being copied into the directory changes size between two scans, so it is only
+            # picked up once it has been seen unchanged twice in a row.
+            if latest_weights != candidate:
+                candidate = latest_weights
+                continue
+            try:
+                self.load(latest_weights[0])
+            except Exception as exception:
+                print("Could not hot-swap the weights from {}: {}".format(latest_weights[0], exception))
+                # The same file is not retried; a new version of it (other mtime or size) will be.
+                ignored_weights.add(latest_weights)
+            candidate = None
+
+    def scan_weights(self):
+        """
+        Returns the (path, modification time, size) of every .h5 file in the models directory, or of the served
+        .tflite file with a TFLite backend (a re-export replaces it in place).
+        """
+        if self.is_tflite_backend(self.__inference_backend):
+            paths = [self.__weights_path] if os.path.exists(self.__weights_path) else []
+        elif os.path.isdir(self.__models_directory):
+            paths = [os.path.join(self.__models_directory, filename)
+                     for filename in os.listdir(self.__models_directory) if filename.endswith(".h5")]
+        else:
+            paths = []
+        weights = set()
+        for path in paths:
+            status = os.stat(path)
+            weights.add((path, status.st_mtime, status.st_size))
+        return weights
+
+    def find_latest_weights(self, ignored_weights=frozenset()):
+        new_weights = self.scan_weights() - ignored_weights
+        return max(new_weights, key=lambda weights: weights[1]) if len(new_weights) > 0 else None
+
+    def load(self, weights_path=None):
+        if weights_path is None:
+            weights_path = self.__weights_path
+        print("Loading the weights from {}...".format(weights_path))
+        if self.is_tflite_backend(self.__inference_backend) and not os.path.exists(weights_path):
+            raise FileNotFoundError("The {} backend needs {}, run export_tflite.py first.".format(
+                self.__inference_backend, weights_path))
+        status = os.stat(weights_path)
+        # TensorFlow is imported by the watcher thread, so the app can start serving /health before it is loaded.
+        if self.is_tflite_backend(self.__inference_backend):
+            from TFLiteInference import TFLiteInference
+            model = TFLiteInference(model_path=weights_path)
+        else:
+            from model import create_model
+            model = create_model(plot=False)
+            model.load_weights(weights_path)
+            model = self.create_inference_backend(model, self.__inference_backend)
+        model.predict(np.zeros((BATCH_SIZE, LOW_RESOLUTION_DIMENSION, 1), dtype=np.float32),
+                      batch_size=BATCH_SIZE, verbose=0)
+
+        with self.__lock:
+            self.__model = model
+            self.__loaded_weights = (weights_path, status.st_mtime, status.st_size)
+            self.__loaded_at = datetime.datetime.now()
+        self.__ready.set()
+        print("Model ready (weights: {}).".format(weights_path))
+
+    @staticmethod
+    def is_tflite_backend(inference_backend):
+        return inference_backend in ("tflite-float16", "tflite-int8")
+
+    @staticmethod
+    def get_tflite_model_path(inference_backend):
+        return TFLITE_MODEL_PATH.format(inference_backend[len("tflite-"):])
+
+    @staticmethod
+    def create_inference_backend(model, inference_backend=INFERENCE_BACKEND):
+        """
+        Wraps a Keras model in the INFERENCE_BACKEND used for serving. Every backend offers model.predict's interface.
+        The TFLite backends load the model written by export_tflite.py (TFLITE_MODEL_PATH) instead of the Keras one.
+        """
+        if inference_backend == "keras":
+            return model
+        if inference_backend == "compiled":
+            from CompiledInference import CompiledInference
+            return CompiledInference(model)
+        if ModelRegistry.is_tflite_backend(inference_backend):
+            # The TFLite models are converted (and the int8 one calibrated on the training split) by export_tflite.py,
+            # so serving only needs the .tflite file, not the dataset.
+            from TFLiteInference import TFLiteInference
+            tflite_model_path = ModelRegistry.get_tflite_model_path(inference_backend)
+            if not os.path.exists(tflite_model_path):
+                raise FileNotFoundError("The {} backend needs {}, run export_tflite.py first.".format(
+                    inference_backend, tflite_model_path))
+            return TFLiteInference(model_path=tflite_model_path)
+        raise ValueError("Unknown inference backend: {}".format(inference_backend))
+
+    def get_model(self, timeout=None):
+        if not self.__ready.wait(timeout):
+            raise TimeoutError("The model is not loaded yet.")
+        with self.__lock:
+            return self.__model
+
+    def get_model_and_weights(self, timeout=None):
+        """
+        Returns the model being served and its (path, modification time, size), read together so that they always
+        belong to the same load.
+        """
+        if not self.__ready.wait(timeout):
+            raise TimeoutError("The model is not loaded yet.")
+        with self.__lock:
+            return self.__model, self.__loaded_weights
+
+    def get_loaded_weights(self):
+        """
+        Returns (path, modification time, size) of the weights being served, or None before the first load.
+        """
+        with self.__lock:
+            return self.__loaded_weights
+
+    def is_ready(self):
+        return self.__ready.is_set()
+
+    def status(self):
+        with self.__lock:
+            return {
+                "ready": self.__ready.is_set(),
+                "backend": self.__inference_backend,
+                "weights": self.__loaded_weights[0] if self.__loaded_weights is not None else None,
+                "loaded_at": self.__loaded_at.strftime("%Y-%m-%d %H:%M:%S") if self.__loaded_at is not None else None
+            }
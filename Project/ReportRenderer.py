@@ -0,0 +1,40 @@
+from concurrent.futures import ThreadPoolExecutor
+from ResultCache import ResultCache
+from constants import *
+
+
+class ReportRenderer:
+    """
+    Renders spectrogram reports on a small pool of worker threads, away from the inference path, and keeps the PNGs
+    in their own ResultCache keyed by the id of the result they describe, so a report is rendered at most once.
+    """
+    def __init__(self, number_of_workers=NUMBER_OF_REPORT_WORKERS, report_cache=None):
+        self.__executor = ThreadPoolExecutor(max_workers=number_of_workers)
+        self.__report_cache = report_cache if report_cache is not None else ResultCache(REPORT_CACHE_BYTE_BUDGET)
+
+    def start(self):
+        self.__report_cache.start()
+
+    def submit(self, downsampled_array, sample_array, output, result_id=None):
+        """
+        Returns a future resolving to the PNG report. Results with an id are looked up in and added to the cache.
+        """
+        def render():
+            # librosa and matplotlib are only imported once the first report is needed.
+            from reports import render_spectrograms
+            if result_id is not None:
+                report = self.__report_cache.get(result_id)
+                if report is not None:
+                    return report
+            report = render_spectrograms(downsampled_array, sample_array, output)
+            if result_id is not None:
+                self.__report_cache.put(result_id, report)
+            return report
+
+        return self.__executor.submit(render)
+
+    def get_cached_report(self, result_id):
+        return self.__report_cache.get(result_id)
+
+    def status(self):
+        return self.__report_cache.status()
@@ -0,0 +1,99 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from constants import *
+
+
+class ResultCache:
+    """
+    In-memory store of finished results, keyed by a hash of the input audio and of everything else that determines
+    the output (weights, resampling factor, backend). The least recently used results are evicted once the stored
+    bytes exceed byte_budget, and a cleaner thread drops the results older than time_to_live seconds.
+    """
+    def __init__(self, byte_budget=RESULT_CACHE_BYTE_BUDGET, time_to_live=RESULT_CACHE_TIME_TO_LIVE,
+                 cleanup_interval=RESULT_CACHE_CLEANUP_INTERVAL):
+        self.__byte_budget = byte_budget
+        self.__time_to_live = time_to_live
+        self.__cleanup_interval = cleanup_interval
+        self.__entries = OrderedDict()
+        self.__number_of_bytes = 0
+        self.__hits, self.__misses, self.__evictions, self.__expirations = 0, 0, 0, 0
+        self.__lock = threading.Lock()
+        self.__stopped = threading.Event()
+        self.__cleaner = None
+
+    @staticmethod
+    def create_key(sample_array, *parameters):
+        sample_array = np.ascontiguousarray(sample_array)
+        key = hashlib.sha256()
+        key.update("{}{}".format(sample_array.dtype.str, sample_array.shape).encode())
+        key.update(memoryview(sample_array).cast("B"))
+        for parameter in parameters:
+            key.update(repr(parameter).encode())
+        return key.hexdigest()
+
+    def start(self):
+        if self.__cleaner is not None:
+            return
+        self.__cleaner = threading.Thread(target=self.run_cleaner, daemon=True)
+        self.__cleaner.start()
+
+    def stop(self):
+        self.__stopped.set()
+
+    def run_cleaner(self):
+        while not self.__stopped.wait(self.__cleanup_interval):
+            self.remove_expired_entries()
+
+    def get(self, key):
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None and entry[1] < time.time() - self.__time_to_live:
+                self.remove_entry(key)
+                self.__expirations += 1
+                entry = None
+            if entry is None:
+                self.__misses += 1
+                return None
+            self.__entries.move_to_end(key)
+            self.__hits += 1
+            return entry[0]
+
+    def put(self, key, result):
+        if len(result) > self.__byte_budget:
+            return
+        with self.__lock:
+            if key in self.__entries:
+                self.remove_entry(key)
+            self.__entries[key] = (result, time.time())
+            self.__number_of_bytes += len(result)
+            while self.__number_of_bytes > self.__byte_budget:
+                self.remove_entry(next(iter(self.__entries)))
+                self.__evictions += 1
+
+    def remove_entry(self, key):
+        result, _ = self.__entries.pop(key)
+        self.__number_of_bytes -= len(result)
+
+    def remove_expired_entries(self):
+        expiry_time = time.time() - self.__time_to_live
+        with self.__lock:
+            for key in [key for key, (_, stored_at) in self.__entries.items() if stored_at < expiry_time]:
+                self.remove_entry(key)
+                self.__expirations += 1
+
+    def status(self):
+        with self.__lock:
+            number_of_lookups = self.__hits + self.__misses
+            return {
+                "entries": len(self.__entries),
+                "bytes": self.__number_of_bytes,
+                "byte_budget": self.__byte_budget,
+                "hits": self.__hits,
+                "misses": self.__misses,
+                "hit_ratio": self.__hits / number_of_lookups if number_of_lookups > 0 else None,
+                "evictions": self.__evictions,
+                "expirations": self.__expirations
+            }
@@ -0,0 +1,166 @@
+import json
+import os
+import numpy as np
+from multiprocessing.shared_memory import SharedMemory
+from numpy.lib.stride_tricks import as_strided
+from constants import *
+from DatasetStatistics import DatasetStatistics
+
+RECORD_INDEX_DTYPE = np.dtype([("track", np.int32), ("offset", np.int64)])
+
+
+def count_records(track_length):
+    track_length -= track_length % RESAMPLING_FACTOR
+    return len(range(0, track_length - SAMPLE_DIMENSION, OVERLAP))
+
+
+def cut_record_pairs(sample_array):
+    """
+    Returns read-only (number_of_records, LOW_RESOLUTION_DIMENSION, 1) and (number_of_records, SAMPLE_DIMENSION, 1)
+    strided views holding the low-res/high-res pairs of a track: a SAMPLE_DIMENSION window every OVERLAP samples,
+    decimated by RESAMPLING_FACTOR.
+    """
+    sample_array = np.ascontiguousarray(sample_array).reshape(-1)
+    number_of_records = count_records(len(sample_array))
+    stride = sample_array.strides[0]
+    high_resolution_chunks = as_strided(sample_array, shape=(number_of_records, SAMPLE_DIMENSION, 1),
+                                        strides=(OVERLAP * stride, stride, stride), writeable=False)
+    return high_resolution_chunks[:, 0::RESAMPLING_FACTOR], high_resolution_chunks
+
+
+class ShardWriter:
+    """
+    Writes the low-res/high-res pairs of a group of tracks into one shard: two contiguous int16 .npy arrays of
+    shapes (number_of_records, LOW_RESOLUTION_DIMENSION, 1) and (number_of_records, SAMPLE_DIMENSION, 1) plus an
+    index holding the track and the sample offset of every record.
+    """
+    def __init__(self, directory, shard_name, number_of_records):
+        self.__low_resolution_records = np.lib.format.open_memmap(
+            os.path.join(directory, shard_name + "_low_res.npy"), mode="w+", dtype=np.int16,
+            shape=(number_of_records, LOW_RESOLUTION_DIMENSION, 1))
+        self.__high_resolution_records = np.lib.format.open_memmap(
+            os.path.join(directory, shard_name + "_high_res.npy"), mode="w+", dtype=np.int16,
+            shape=(number_of_records, SAMPLE_DIMENSION, 1))
+        self.__record_index = np.lib.format.open_memmap(
+            os.path.join(directory, shard_name + "_index.npy"), mode="w+", dtype=RECORD_INDEX_DTYPE,
+            shape=(number_of_records,))
+        self.__position = 0
+
+    def write_track(self, track_index, sample_array):
+        low_resolution_chunks, high_resolution_chunks = cut_record_pairs(sample_array)
+        number_of_records = len(high_resolution_chunks)
+        if number_of_records == 0:
+            return 0
+
+        records = slice(self.__position, self.__position + number_of_records)
+        self.__high_resolution_records[records] = high_resolution_chunks
+        self.__low_resolution_records[records] = low_resolution_chunks
+        self.__record_index["track"][records] = track_index
+        self.__record_index["offset"][records] = np.arange(number_of_records) * OVERLAP
+        self.__position += number_of_records
+        return number_of_records
+
+    def close(self):
+        self.__low_resolution_records.flush()
+        self.__high_resolution_records.flush()
+        self.__record_index.flush()
+        return self.__position
+
+
+def run_shard_generation_task(shared_memory_name, number_of_samples, tracks, shard_name,
+                              directory=SHARDED_DATASET_DIRECTORY):
+    """
+    Worker entry point: writes one shard from tracks = [(track_index, offset, length), ...] stored in an int16
+    shared memory block. Returns the shard name, the number of tracks and of record pairs written, and the
+    statistics of the high-res records (None for an empty shard).
+    """
+    number_of_records = sum(count_records(length) for _, _, length in tracks)
+    if number_of_records == 0:
+        return shard_name, len(tracks), 0, None
+
+    statistics = DatasetStatistics()
+    shared_memory = SharedMemory(name=shared_memory_name)
+    try:
+        samples = np.ndarray((number_of_samples,), dtype=np.int16, buffer=shared_memory.buf)
+        shard_writer = ShardWriter(directory, shard_name, number_of_records)
+        for track_index, offset, length in tracks:
+            track_samples = samples[offset:offset + length]
+            shard_writer.write_track(track_index, track_samples)
+            statistics.update(cut_record_pairs(track_samples)[1])
+        shard_writer.close()
+        del samples, track_samples
+    finally:
+        shared_memory.close()
+    return shard_name, len(tracks), number_of_records, statistics
+
+
+class ShardedDataset:
+    """
+    Read-only view over the shards listed in a manifest. The arrays are memory-mapped, so reading a range of
+    records that lies inside one shard returns a view without copying anything.
+    """
+    def __init__(self, directory=SHARDED_DATASET_DIRECTORY):
+        with open(os.path.join(directory, SHARD_MANIFEST_FILENAME)) as manifest_file:
+            manifest = json.load(manifest_file)
+        self.__shards = []
+        for shard in manifest["shards"]:
+            self.__shards.append((
+                np.load(os.path.join(directory, shard["name"] + "_low_res.npy"), mmap_mode="r"),
+                np.load(os.path.join(directory, shard["name"] + "_high_res.npy"), mmap_mode="r"),
+                np.load(os.path.join(directory, shard["name"] + "_index.npy"), mmap_mode="r")
+            ))
+        self.__boundaries = np.cumsum([0] + [shard["number_of_records"] for shard in manifest["shards"]])
+
+    def __len__(self):
+        return int(self.__boundaries[-1])
+
+    def get_shards(self):
+        """
+        Returns (first_record, low_res, high_res, index) for every shard, in record order.
+        """
+        return [(int(self.__boundaries[shard_index]),) + self.__shards[shard_index]
+                for shard_index in range(len(self.__shards))]
+
+    def read(self, start, stop):
+        low_resolution_parts, high_resolution_parts, index_parts = [], [], []
+        first_shard = np.searchsorted(self.__boundaries, start, side="right") - 1
+        for shard_index in range(max(first_shard, 0), len(self.__shards)):
+            shard_start = self.__boundaries[shard_index]
+            if shard_start >= stop:
+                break
+            low_resolution_records, high_resolution_records, record_index = self.__shards[shard_index]
+            records = slice(max(start - shard_start, 0), min(stop - shard_start, len(record_index)))
+            low_resolution_parts.append(low_resolution_records[records])
+            high_resolution_parts.append(high_resolution_records[records])
+            index_parts.append(record_index[records])
+
+        if len(index_parts) == 1:
+            return low_resolution_parts[0], high_resolution_parts[0], index_parts[0]
+        if len(index_parts) == 0:
+            return (np.zeros((0, LOW_RESOLUTION_DIMENSION, 1), dtype=np.int16),
+                    np.zeros((0, SAMPLE_DIMENSION, 1), dtype=np.int16),
+                    np.zeros(0, dtype=RECORD_INDEX_DTYPE))
+        return np.concatenate(low_resolution_parts), np.concatenate(high_resolution_parts), np.concatenate(index_parts)
+
+    @staticmethod
+    def write_manifest(shard_names, directory=SHARDED_DATASET_DIRECTORY):
+        """
+        Lists the given shards, in name order (which is the record order), in the manifest of the directory. Other
+        shard files that may be lying in the directory are not part of the dataset.
+        """
+        shards = []
+        for shard_name in sorted(shard_names):
+            record_index = np.load(os.path.join(directory, shard_name + "_index.npy"), mmap_mode="r")
+            shards.append({"name": shard_name, "number_of_records": len(record_index)})
+
+        manifest = {
+            "number_of_records": sum(shard["number_of_records"] for shard in shards),
+            "sample_dimension": SAMPLE_DIMENSION,
+            "low_resolution_dimension": LOW_RESOLUTION_DIMENSION,
+            "overlap": OVERLAP,
+            "resampling_factor": RESAMPLING_FACTOR,
+            "shards": shards
+        }
+        with open(os.path.join(directory, SHARD_MANIFEST_FILENAME), "w") as manifest_file:
+            json.dump(manifest, manifest_file, indent=4)
+        return manifest
@@ -0,0 +1,123 @@
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+from constants import *
+
+
+def create_crossfade_window(window_length, crossfade_length):
+    """
+    A flat window whose first and last crossfade_length samples are raised-cosine ramps. The ramps are sampled at
+    half-sample offsets, so they never reach zero and the overlap-add normalisation is always defined.
+    """
+    window = np.ones(window_length, dtype=np.float32)
+    if crossfade_length > 0:
+        ramp = np.sin(0.5 * np.pi * (np.arange(crossfade_length) + 0.5) / crossfade_length) ** 2
+        window[:crossfade_length] = ramp
+        window[window_length - crossfade_length:] = ramp[::-1]
+    return window
+
+
+def iterate_frames(signal, frame_length=LOW_RESOLUTION_DIMENSION):
+    for sample_index in range(0, len(signal), frame_length):
+        yield signal[sample_index:sample_index + frame_length]
+
+
+class StreamingSuperResolver:
+    """
+    Super-resolves a low-res signal that arrives as a sequence of frames of any length. Windows of
+    LOW_RESOLUTION_DIMENSION samples are cut every LOW_RESOLUTION_DIMENSION - overlap samples and the model outputs
+    are combined with windowed overlap-add, which removes the seams left by concatenating independent chunks.
+
+    Only the unconsumed low-res samples and one SAMPLE_DIMENSION overlap-add accumulator are kept, so memory does
+    not grow with the length of the stream. High-res samples are returned as soon as no later window can still
+    contribute to them.
+    """
+    def __init__(self, model, overlap=OVERLAP // RESAMPLING_FACTOR, batch_size=BATCH_SIZE):
+        if not 0 <= overlap < LOW_RESOLUTION_DIMENSION:
+            raise ValueError("The overlap must be between 0 and {} samples.".format(LOW_RESOLUTION_DIMENSION - 1))
+        self.__model = model
+        self.__batch_size = batch_size
+        self.__hop = LOW_RESOLUTION_DIMENSION - overlap
+        self.__window = create_crossfade_window(SAMPLE_DIMENSION, overlap * RESAMPLING_FACTOR)
+        self.__pending = np.zeros(0, dtype=np.float32)
+        self.__accumulator = np.zeros(SAMPLE_DIMENSION, dtype=np.float32)
+        self.__weights = np.zeros(SAMPLE_DIMENSION, dtype=np.float32)
+        self.__received = 0
+        self.__emitted = 0
+
+    @staticmethod
+    def create(weights_path=MODEL_PATH, overlap=OVERLAP // RESAMPLING_FACTOR, batch_size=BATCH_SIZE):
+        from model import create_model
+        model = create_model(batch_size=batch_size, plot=False)
+        model.load_weights(weights_path)
+        return StreamingSuperResolver(model, overlap, batch_size)
+
+    def process(self, low_resolution_frame):
+        """
+        Consumes a low-res frame and returns the high-res samples that became final (possibly none).
+        """
+        low_resolution_frame = np.asarray(low_resolution_frame, dtype=np.float32).reshape(-1)
+        self.__received += len(low_resolution_frame)
+        self.__pending = np.concatenate([self.__pending, low_resolution_frame])
+        if len(self.__pending) < LOW_RESOLUTION_DIMENSION:
+            return np.zeros(0, dtype=np.float32)
+
+        number_of_windows = (len(self.__pending) - LOW_RESOLUTION_DIMENSION) // self.__hop + 1
+        stride = self.__pending.strides[0]
+        windows = as_strided(self.__pending, shape=(number_of_windows, LOW_RESOLUTION_DIMENSION, 1),
+                             strides=(self.__hop * stride, stride, stride), writeable=False)
+        output = self.__overlap_add(self.__predict(windows), self.__hop * RESAMPLING_FACTOR)
+        self.__pending = self.__pending[number_of_windows * self.__hop:]
+        return output
+
+    def finish(self):
+        """
+        Flushes the samples still held back, zero-padding the last window. The total output is exactly
+        RESAMPLING_FACTOR times the number of low-res samples received.
+        """
+        remaining = self.__received * RESAMPLING_FACTOR - self.__emitted
+        if remaining <= 0:
+            return np.zeros(0, dtype=np.float32)
+        last_window = np.zeros((1, LOW_RESOLUTION_DIMENSION, 1), dtype=np.float32)
+        last_window[0, :len(self.__pending), 0] = self.__pending
+        self.__pending = np.zeros(0, dtype=np.float32)
+        return self.__overlap_add(self.__predict(last_window), remaining)
+
+    def get_number_of_held_back_samples(self):
+        """
+        High-res samples of the low-res samples received so far that were not returned yet: the current algorithmic
+        latency, which never exceeds RESAMPLING_FACTOR * (LOW_RESOLUTION_DIMENSION - 1) samples.
+        """
+        return self.__received * RESAMPLING_FACTOR - self.__emitted
+
+    def stream(self, low_resolution_frames):
+        for low_resolution_frame in low_resolution_frames:
+            high_resolution_block = self.process(low_resolution_frame)
+            if high_resolution_block.size > 0:
+                yield high_resolution_block
+        high_resolution_block = self.finish()
+        if high_resolution_block.size > 0:
+            yield high_resolution_block
+
+    def __predict(self, windows):
+        number_of_windows = len(windows)
+        padded_length = -(-number_of_windows // self.__batch_size) * self.__batch_size
+        batch = np.zeros((padded_length, LOW_RESOLUTION_DIMENSION, 1), dtype=np.float32)
+        batch[:number_of_windows] = windows
+        prediction = self.__model.predict(batch, batch_size=self.__batch_size, verbose=0)
+        return prediction[:number_of_windows].reshape(number_of_windows, SAMPLE_DIMENSION)
+
+    def __overlap_add(self, predictions, samples_to_emit_per_window):
+        output = np.empty(len(predictions) * samples_to_emit_per_window, dtype=np.float32)
+        for window_index, prediction in enumerate(predictions):
+            self.__accumulator += self.__window * prediction
+            self.__weights += self.__window
+            output_slice = output[window_index * samples_to_emit_per_window:
+                                  (window_index + 1) * samples_to_emit_per_window]
+            output_slice[:] = self.__accumulator[:samples_to_emit_per_window] / self.__weights[:samples_to_emit_per_window]
+
+            self.__accumulator[:-samples_to_emit_per_window] = self.__accumulator[samples_to_emit_per_window:]
+            self.__accumulator[-samples_to_emit_per_window:] = 0
+            self.__weights[:-samples_to_emit_per_window] = self.__weights[samples_to_emit_per_window:]
+            self.__weights[-samples_to_emit_per_window:] = 0
+        self.__emitted += len(output)
+        return output
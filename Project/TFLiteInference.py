@@ -0,0 +1,95 @@
+import threading
+import numpy as np
+import tensorflow as tf
+from constants import *
+
+
+def create_representative_dataset(number_of_batches=TFLITE_NUMBER_OF_CALIBRATION_BATCHES, batch_size=BATCH_SIZE):
+    """
+    Calibration data for the int8 conversion: batches of low-res records drawn at random from the training split.
+    """
+    from DatasetGenerator import DatasetGenerator
+    records = DatasetGenerator.open_dataset()
+    (training_start, training_stop), _, _ = DatasetGenerator.split_records(len(records))
+    record_indices = np.sort(np.random.default_rng(0).choice(np.arange(training_start, training_stop),
+                                                             size=number_of_batches * batch_size, replace=False))
+
+    def representative_dataset():
+        for batch_start in range(0, len(record_indices), batch_size):
+            batch = [records.read(record_index, record_index + 1)[0]
+                     for record_index in record_indices[batch_start:batch_start + batch_size]]
+            yield [np.concatenate(batch).astype(np.float32)]
+
+    return representative_dataset
+
+
+def convert_to_tflite(model, quantization):
+    """
+    Converts a fixed-shape Keras model to a TFLite flatbuffer:
+    - "float16": float16 weights, float32 computations;
+    - "int8": int8 weights and activations (integer-only kernels), calibrated on the training split. The input and
+      the output of the model stay float32, so callers do not quantize the audio themselves.
+    """
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantization == "float16":
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantization == "int8":
+        converter.representative_dataset = create_representative_dataset(batch_size=model.input_shape[0])
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    else:
+        raise ValueError("Unknown TFLite quantization: {}".format(quantization))
+    return converter.convert()
+
+
+class TFLiteInference:
+    """
+    Runs a TFLite model with a multi-threaded interpreter behind the model.predict interface. The interpreter is not
+    thread-safe, so the invocations are serialised.
+    """
+    def __init__(self, model_content=None, model_path=None, number_of_threads=TFLITE_NUMBER_OF_THREADS):
+        self.__interpreter = tf.lite.Interpreter(model_content=model_content, model_path=model_path,
+                                                 num_threads=number_of_threads)
+        self.__interpreter.allocate_tensors()
+        self.__input_details = self.__interpreter.get_input_details()[0]
+        self.__output_details = self.__interpreter.get_output_details()[0]
+        self.__batch_size = self.__input_details["shape"][0]
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def quantize(values, details):
+        if details["dtype"] == np.float32:
+            return values.astype(np.float32)
+        scale, zero_point = details["quantization"]
+        integer_range = np.iinfo(details["dtype"])
+        return np.clip(np.round(values / scale + zero_point), integer_range.min, integer_range.max) \
+            .astype(details["dtype"])
+
+    @staticmethod
+    def dequantize(values, details):
+        if details["dtype"] == np.float32:
+            return values
+        scale, zero_point = details["quantization"]
+        return (values.astype(np.float32) - zero_point) * scale
+
+    def predict(self, input_chunks, batch_size=None, verbose=0):
+        """
+        Accepts any number of chunks; only the last batch is zero-padded. batch_size is ignored, the batch size is
+        the one the model was converted with.
+        """
+        input_chunks = np.asarray(input_chunks, dtype=np.float32).reshape(-1, LOW_RESOLUTION_DIMENSION, 1)
+        output = np.empty((len(input_chunks), SAMPLE_DIMENSION, 1), dtype=np.float32)
+        input_batch = np.zeros((self.__batch_size, LOW_RESOLUTION_DIMENSION, 1), dtype=np.float32)
+
+        for batch_start in range(0, len(input_chunks), self.__batch_size):
+            batch = input_chunks[batch_start:batch_start + self.__batch_size]
+            input_batch[:len(batch)] = batch
+            input_batch[len(batch):] = 0
+            with self.__lock:
+                self.__interpreter.set_tensor(self.__input_details["index"],
+                                              self.quantize(input_batch, self.__input_details))
+                self.__interpreter.invoke()
+                prediction = self.__interpreter.get_tensor(self.__output_details["index"])
+            output[batch_start:batch_start + len(batch)] = \
+                self.dequantize(prediction, self.__output_details)[:len(batch)]
+        return output
@@ -0,0 +1,106 @@
+import os
+import numpy as np
+from constants import *
+from ShardedDataset import RECORD_INDEX_DTYPE, count_records, cut_record_pairs
+
+TRACK_TABLE_DTYPE = np.dtype([("offset", np.int64), ("length", np.int64)])
+
+
+class WaveformCorpusWriter:
+    """
+    Appends whole int16 recordings to a single raw samples file and keeps a table with the offset, the length, the
+    speaker and the transcript of every track.
+    """
+    def __init__(self, directory=WAVEFORM_CORPUS_DIRECTORY):
+        os.makedirs(directory, exist_ok=True)
+        self.__directory = directory
+        self.__samples_file = open(os.path.join(directory, WAVEFORM_CORPUS_SAMPLES_FILENAME), "wb")
+        self.__tracks = []
+        self.__number_of_samples = 0
+
+    def write_track(self, sample_array, speaker="", transcript=""):
+        sample_array = np.ascontiguousarray(sample_array, dtype=np.int16).reshape(-1)
+        self.__samples_file.write(sample_array.tobytes())
+        self.__tracks.append((self.__number_of_samples, len(sample_array), speaker.encode("utf-8"),
+                              transcript.encode("utf-8")))
+        self.__number_of_samples += len(sample_array)
+        return len(self.__tracks) - 1
+
+    def close(self):
+        self.__samples_file.close()
+        # The UTF-8 text columns are sized for the longest speaker and transcript, so the table stays a plain .npy
+        # array that can be memory-mapped.
+        speaker_length = max([len(track[2]) for track in self.__tracks] + [1])
+        transcript_length = max([len(track[3]) for track in self.__tracks] + [1])
+        track_table_dtype = np.dtype(TRACK_TABLE_DTYPE.descr + [("speaker", "S{}".format(speaker_length)),
+                                                                ("transcript", "S{}".format(transcript_length))])
+        np.save(os.path.join(self.__directory, WAVEFORM_CORPUS_TRACKS_FILENAME),
+                np.array(self.__tracks, dtype=track_table_dtype))
+        return len(self.__tracks)
+
+
+class WaveformCorpus:
+    """
+    Memory-mapped view over the recordings written by WaveformCorpusWriter. Every track is returned as an int16 view
+    into the samples file, so fetching any recording costs the same whatever its position in the corpus.
+    """
+    def __init__(self, directory=WAVEFORM_CORPUS_DIRECTORY):
+        self.__samples = np.memmap(os.path.join(directory, WAVEFORM_CORPUS_SAMPLES_FILENAME), dtype=np.int16, mode="r")
+        self.__tracks = np.load(os.path.join(directory, WAVEFORM_CORPUS_TRACKS_FILENAME), mmap_mode="r")
+
+    def __len__(self):
+        return len(self.__tracks)
+
+    def get_track(self, track_index):
+        track = self.__tracks[track_index]
+        return self.__samples[track["offset"]:track["offset"] + track["length"]]
+
+    def get_track_lengths(self):
+        return self.__tracks["length"]
+
+    def get_speaker(self, track_index):
+        return self.__tracks[track_index]["speaker"].decode("utf-8")
+
+    def get_transcript(self, track_index):
+        return self.__tracks[track_index]["transcript"].decode("utf-8")
+
+
+class WindowedCorpusDataset:
+    """
+    Derives the low-res/high-res pairs of the first number_of_tracks corpus tracks on the fly, with the same record
+    order and the same read() interface as ShardedDataset. Only the requested records are materialised, so the
+    window, the overlap and the resampling factor can change without regenerating anything.
+    """
+    def __init__(self, corpus, number_of_tracks=AMOUNT_OF_TRACKS_USED_FOR_DATA_GENERATION):
+        self.__corpus = corpus
+        self.__number_of_tracks = min(number_of_tracks, len(corpus))
+        record_counts = [count_records(int(track_length))
+                         for track_length in corpus.get_track_lengths()[:self.__number_of_tracks]]
+        self.__boundaries = np.cumsum([0] + record_counts)
+
+    def __len__(self):
+        return int(self.__boundaries[-1])
+
+    def read(self, start, stop):
+        low_resolution_parts, high_resolution_parts, index_parts = [], [], []
+        first_track = np.searchsorted(self.__boundaries, start, side="right") - 1
+        for track_index in range(max(first_track, 0), self.__number_of_tracks):
+            track_start = self.__boundaries[track_index]
+            if track_start >= stop:
+                break
+            records = slice(max(start - track_start, 0), min(stop - track_start, self.__boundaries[track_index + 1] - track_start))
+            if records.start >= records.stop:
+                continue
+            low_resolution_chunks, high_resolution_chunks = cut_record_pairs(self.__corpus.get_track(track_index))
+            record_index = np.zeros(records.stop - records.start, dtype=RECORD_INDEX_DTYPE)
+            record_index["track"] = track_index
+            record_index["offset"] = np.arange(records.start, records.stop) * OVERLAP
+            low_resolution_parts.append(low_resolution_chunks[records])
+            high_resolution_parts.append(high_resolution_chunks[records])
+            index_parts.append(record_index)
+
+        if len(index_parts) == 0:
+            return (np.zeros((0, LOW_RESOLUTION_DIMENSION, 1), dtype=np.int16),
+                    np.zeros((0, SAMPLE_DIMENSION, 1), dtype=np.int16),
+                    np.zeros(0, dtype=RECORD_INDEX_DTYPE))
+        return np.concatenate(low_resolution_parts), np.concatenate(high_resolution_parts), np.concatenate(index_parts)
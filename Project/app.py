@@ -1,270 +1,371 @@
-from flask import Flask, send_file, request
-from model import create_model
-from zipfile import ZipFile
+from flask import Flask, send_file, request, jsonify, url_for
+from flask_sock import Sock
+from StreamingSuperResolver import StreamingSuperResolver
+from ModelRegistry import ModelRegistry
+from MicroBatchScheduler import MicroBatchScheduler
+from JobQueue import JobQueue, JobQueueFullError
+from ResultCache import ResultCache
 import time
+from functools import lru_cache
 from constants import *
-import tensorflow_datasets as tfds
-import tensorflow as tf
-from DatasetGenerator import DatasetGenerator
+from WaveformCorpus import WaveformCorpus
+from inference import downsample, super_resolve, iterate_downsampled_blocks
+from audio_io import decode_wav, encode_wav, create_zip_archive, read_zip_archive, iterate_stream_blocks, \
+    iterate_multipart_file, BlockReader, read_wav_header, iterate_wav_samples, decode_pcm, encode_pcm
+from ReportRenderer import ReportRenderer
 import numpy as np
-from metrics import *
-import librosa
-import librosa.display
-import soundfile as sf
-import datetime
-import matplotlib.pyplot as plt
+import io
+import json
 import random
-import re
-import shutil
 from base64 import b64decode
-import scipy.io.wavfile
 
 app = Flask(__name__)
+sock = Sock(app)
+model_registry = ModelRegistry()
+model_registry.start()
+micro_batch_scheduler = MicroBatchScheduler(model_registry)
+micro_batch_scheduler.start()
+result_cache = ResultCache()
+result_cache.start()
+report_renderer = ReportRenderer()
+report_renderer.start()
+
+
+@lru_cache(maxsize=None)
+def open_vctk_corpus():
+    return WaveformCorpus(VCTK_CORPUS_DIRECTORY)
+
+
+@app.route("/health")
+def health():
+    status = model_registry.status()
+    status["scheduler"] = micro_batch_scheduler.status()
+    status["jobs"] = job_queue.status()
+    return jsonify(status), 200 if status["ready"] else 503
+
+
+@app.route("/cache")
+def cacheStatus():
+    return jsonify({"results": result_cache.status(), "reports": report_renderer.status()})
+
+
+@app.route("/reports/<result_id>")
+def getReport(result_id):
+    """
+    Spectrogram report of a result returned by /upload (see its X-Result-Id header), rendered on first request.
+    """
+    report = report_renderer.get_cached_report(result_id)
+    if report is None:
+        audio_archive = result_cache.get(result_id)
+        if audio_archive is None:
+            return jsonify({"error": "Unknown or expired result."}), 404
+        report = submit_report_for_archive(result_id, audio_archive).result()
+    return send_file(io.BytesIO(report), mimetype="image/png")
 
 
 @app.route("/predict")
 def predict():
-    print("Loading and compiling model...")
-    model = create_model()
-    model.compile(loss="mean_squared_error", optimizer='Adam',
-                  metrics=[signal_to_noise_ratio, normalised_root_mean_squared_error],
-                  run_eagerly=True)
-    model.load_weights(MODEL_PATH)
-
-    print("Loading the sample vocal recording from the VCTK dataset...")
-    dataset = tfds.load("vctk", with_info=False)
-    sample_array = None
-    transcript = None
-    recording_index = 0
+    print("Loading the sample vocal recording from the VCTK index...")
+    vctk_corpus = open_vctk_corpus()
 
     chosen_recording = random.randint(AMOUNT_OF_TRACKS_USED_FOR_DATA_GENERATION + 1,
                                       AMOUNT_OF_TRACKS_USED_FOR_DATA_GENERATION + 10)
 
-    for sample in dataset['train']:
-        if recording_index == chosen_recording:
-            transcript = sample['text']
-            print("Recording transcript: {}".format(transcript))
-            sample_array = np.array(sample['speech'], dtype=float)
-            break
-        recording_index += 1
+    transcript = vctk_corpus.get_transcript(chosen_recording)
+    print("Recording transcript: {}".format(transcript))
+    sample_array = vctk_corpus.get_track(chosen_recording)
 
     print("Downsampling the audio...")
-
-    sample_array_length = len(sample_array)
-    sample_array = sample_array[:sample_array_length - (sample_array_length % RESAMPLING_FACTOR)]
-    downsampled_array = np.array(sample_array[0::RESAMPLING_FACTOR])
-
-    downsampled_array = np.reshape(downsampled_array, (len(downsampled_array), 1))
-    sample_array = np.reshape(sample_array, (len(sample_array), 1))
+    sample_array, downsampled_array = downsample(sample_array)
 
     print("Sample array length: {}".format(len(sample_array)))
     print("Downsampled array length: {}".format(len(downsampled_array)))
-
-    super_resolution_output_chunks = []
-
-    print("Cutting chunks from the downsampled audio (length={}) and feeding batches to the model...".format(
-        len(downsampled_array)))
-
-    for sample_index in range(0, len(downsampled_array), LOW_RESOLUTION_DIMENSION * BATCH_SIZE):
-        print("> Sample index {}".format(sample_index))
-        input_batch = []
-
-        for batch_sample_index in range(0, BATCH_SIZE):
-            print("--- Batch sample index {}".format(batch_sample_index))
-            if sample_index + (batch_sample_index + 1) * LOW_RESOLUTION_DIMENSION >= len(downsampled_array):
-                chunk = downsampled_array[sample_index + batch_sample_index * LOW_RESOLUTION_DIMENSION:]
-                zeroes_to_add = SAMPLE_DIMENSION // RESAMPLING_FACTOR - len(chunk)
-                array_of_zeroes = np.zeros(zeroes_to_add)
-                chunk = np.append(chunk, array_of_zeroes)
-                chunk = chunk.reshape((chunk.shape[0], 1))
-                print("Chunk shape (1):")
-                print(chunk.shape)
-            else:
-                chunk = downsampled_array[sample_index + batch_sample_index * LOW_RESOLUTION_DIMENSION:
-                                          sample_index + (batch_sample_index + 1) * LOW_RESOLUTION_DIMENSION]
-                print("Chunk shape (2):")
-                print(chunk.shape)
-            print(chunk)
-            input_batch.append(chunk)
-
-        print("> Feeding the low-res batch to the model...")
-        prediction = model.predict(np.array(input_batch))
-        super_resolution_output_chunks.append(prediction.reshape((prediction.shape[0] * prediction.shape[1])))
-        print("Prediction done. Output has been appended to the result.")
-
-    output = np.array([element for sublist in super_resolution_output_chunks for element in sublist])
-    print(output)
+    print("Feeding the downsampled audio (length={}) to the model...".format(len(downsampled_array)))
+    # The scheduler pads the batches itself, across requests, so only the last chunk of this recording is padded.
+    output = super_resolve(micro_batch_scheduler, downsampled_array, batch_size=1)
     print("Output shape: {}".format(output.shape))
-    output = output[:sample_array.size]
-
-    downsampled_array = downsampled_array.reshape(downsampled_array.shape[0])
-    sample_array = sample_array.reshape(sample_array.shape[0])
-    low_resolution_signal_spectrogram = librosa.feature.melspectrogram(y=downsampled_array, sr=DOWNSAMPLED_RATE)
-    high_resolution_signal_spectrogram = librosa.feature.melspectrogram(y=sample_array, sr=VCTK_DATASET_SAMPLING_RATE)
-    super_resolution_signal_spectrogram = librosa.feature.melspectrogram(y=output, sr=VCTK_DATASET_SAMPLING_RATE)
-
-    print("Computed the spectrograms.")
-
-    fig, ax = plt.subplots(3, 1, figsize=(10, 10))
-    low_res_decibel_units = librosa.power_to_db(low_resolution_signal_spectrogram, ref=np.max)
-    high_res_decibel_units = librosa.power_to_db(high_resolution_signal_spectrogram, ref=np.max)
-    super_res_decibel_units = librosa.power_to_db(super_resolution_signal_spectrogram, ref=np.max)
-    ax[0].set_title("Low-res ({} samples)".format(downsampled_array.shape[0]))
-    first_subplot_spectrogram = librosa.display.specshow(low_res_decibel_units, x_axis='time',
-                                                         y_axis='mel', sr=DOWNSAMPLED_RATE, ax=ax[0])
-    ax[1].set_title("High-res ({} samples)".format(sample_array.shape[0]))
-    second_subplot_spectrogram = librosa.display.specshow(high_res_decibel_units, x_axis='time',
-                                                          y_axis='mel', sr=VCTK_DATASET_SAMPLING_RATE, ax=ax[1])
-    ax[2].set_title("Super-res ({} samples)".format(output.size))
-    third_subplot_spectrogram = librosa.display.specshow(super_res_decibel_units, x_axis='time',
-                                                         y_axis='mel', sr=VCTK_DATASET_SAMPLING_RATE, ax=ax[2])
-
-    fig.tight_layout()
-    fig.colorbar(third_subplot_spectrogram, ax=[ax[0], ax[1], ax[2]], format='%+2.0f dB')
-    directory_name = "outputs-" + str(time.time())
-    os.mkdir(directory_name)
-    plt.savefig(directory_name + "/spectrograms-track-{}-transcript-{}.png".format(chosen_recording, transcript))
-    plt.show()
 
-    sf.write(directory_name + "/track-no-{}-high-res.wav".format(chosen_recording), np.int16(sample_array),
-             VCTK_DATASET_SAMPLING_RATE)
-    sf.write(directory_name + "/track-no-{}-low-res.wav".format(chosen_recording), np.int16(downsampled_array), DOWNSAMPLED_RATE)
-    sf.write(directory_name + "/track-no-{}-super-res.wav".format(chosen_recording), np.int16(output.reshape(output.shape)),
-             VCTK_DATASET_SAMPLING_RATE)
-
-    with ZipFile(directory_name + '.zip', 'w') as zip_archive:
-        zip_archive.write(directory_name + "/track-no-{}-high-res.wav".format(chosen_recording))
-        zip_archive.write(directory_name + "/track-no-{}-low-res.wav".format(chosen_recording))
-        zip_archive.write(directory_name + "/track-no-{}-super-res.wav".format(chosen_recording))
-        zip_archive.write(directory_name + "/spectrograms-track-{}-transcript-{}.png".format(chosen_recording, transcript))
-        shutil.rmtree(directory_name + "/")
-
-    return send_file(directory_name + '.zip', mimetype='zip', as_attachment=True)
+    # The report renders on a worker thread while the WAVs are encoded.
+    report = report_renderer.submit(downsampled_array, sample_array, output) if is_report_requested() else None
+    directory_name = "outputs-" + str(time.time())
+    files = {
+        directory_name + "/track-no-{}-high-res.wav".format(chosen_recording):
+            encode_wav(sample_array, VCTK_DATASET_SAMPLING_RATE),
+        directory_name + "/track-no-{}-low-res.wav".format(chosen_recording):
+            encode_wav(downsampled_array, DOWNSAMPLED_RATE),
+        directory_name + "/track-no-{}-super-res.wav".format(chosen_recording):
+            encode_wav(output, VCTK_DATASET_SAMPLING_RATE)
+    }
+    if report is not None:
+        files[directory_name + "/spectrograms-track-{}-transcript-{}.png".format(chosen_recording, transcript)] = \
+            report.result()
+
+    return send_file(create_zip_archive(files), mimetype='zip', as_attachment=True,
+                     download_name=directory_name + '.zip')
+
+
+def decode_uploaded_recording(wav_file):
+    """
+    Returns (sample_rate, samples) of an uploaded WAV. Raises ValueError unless it is sampled at
+    VCTK_DATASET_SAMPLING_RATE: the recordings are downsampled by RESAMPLING_FACTOR before being super-resolved.
+    """
+    sample_rate, sample_array = decode_wav(wav_file)
+    if sample_rate != VCTK_DATASET_SAMPLING_RATE:
+        raise ValueError("The recording is sampled at {} Hz, {} Hz is expected.".format(
+            sample_rate, VCTK_DATASET_SAMPLING_RATE))
+    return sample_rate, sample_array
 
 
 @app.route("/upload", methods=["POST"])
 def uploadAndPredict():
-    print(request.get_json())
-    request_json = request.get_json()
-    recordingAsJson = request_json['recordingAsBase64']
-    print("Base64-encoded WAV file:")
-    base64_encoded_wav_file = recordingAsJson.split("base64,")[1]
-    wav_file = b64decode(base64_encoded_wav_file)
-
-    with open("high-res.wav", "wb") as f:
-        f.write(wav_file)
-
-    print("Loading and compiling model...")
-    model = create_model()
-    model.compile(loss="mean_squared_error", optimizer='Adam',
-                  metrics=[signal_to_noise_ratio, normalised_root_mean_squared_error],
-                  run_eagerly=True)
-    model.load_weights(MODEL_PATH)
-
-    sample_rate, sample_array = scipy.io.wavfile.read('high-res.wav')
-    sample_array = sample_array.astype(float)
+    try:
+        request_json = request.get_json()
+        recordingAsJson = request_json['recordingAsBase64']
+        base64_encoded_wav_file = recordingAsJson.split("base64,")[1]
+        wav_file = b64decode(base64_encoded_wav_file)
+    except (KeyError, IndexError, TypeError, AttributeError, ValueError):
+        return jsonify({"error": "Expected a JSON object whose recordingAsBase64 is a base64 data URL."}), 400
+
+    try:
+        sample_rate, sample_array = decode_uploaded_recording(wav_file)
+    except ValueError as exception:
+        return jsonify({"error": str(exception)}), 400
     print("Sample array dtype:")
     print(sample_array.dtype)
 
-    sf.write("some-track-custom-recording-high-res.wav", np.int16(sample_array),
-             VCTK_DATASET_SAMPLING_RATE)
-
     print("Sample rate of the custom recording: {}".format(sample_rate))
-    print("Downsampling the audio...")
-
-    sample_array_length = len(sample_array)
-    sample_array = sample_array[:sample_array_length - (sample_array_length % RESAMPLING_FACTOR)]
-    downsampled_array = np.array(sample_array[0::RESAMPLING_FACTOR])
-
-    downsampled_array = np.reshape(downsampled_array, (len(downsampled_array), 1))
-    sample_array = np.reshape(sample_array, (len(sample_array), 1))
+    result_id, zip_archive = super_resolve_custom_recording(sample_array, include_report=is_report_requested())
+    response = send_file(zip_archive, mimetype='zip')
+    response.headers["X-Result-Id"] = result_id
+    return response
+
+
+def super_resolve_custom_recording(sample_array, progress_callback=None, include_report=True):
+    """
+    Downsamples and super-resolves an uploaded recording. Returns the id of the result and an in-memory zip archive
+    with the three signals, plus their spectrograms when include_report is set. The audio is served from the result
+    cache when the same recording was already super-resolved by the same weights, and the report is only rendered
+    when it is asked for.
+    """
+    # The key and the super-resolution use the same model, even if the weights are hot-swapped in between.
+    model, loaded_weights = model_registry.get_model_and_weights(timeout=MODEL_LOADING_TIMEOUT)
+    result_id = ResultCache.create_key(sample_array, loaded_weights, RESAMPLING_FACTOR, INFERENCE_BACKEND)
+    audio_archive = result_cache.get(result_id)
+    report = None
+    if audio_archive is not None:
+        print("Serving the audio from the result cache.")
+    else:
+        print("Downsampling the audio...")
+        sample_array, downsampled_array = downsample(sample_array)
+
+        print("Sample array length: {}".format(len(sample_array)))
+        print("Downsampled array length: {}".format(len(downsampled_array)))
+        print("Feeding the downsampled audio (length={}) to the model...".format(len(downsampled_array)))
+        # The scheduler pads the batches itself, across requests, so only the last chunk of this recording is padded.
+        output = super_resolve(micro_batch_scheduler.for_model(model), downsampled_array, batch_size=1,
+                               progress_callback=progress_callback)
+        print("Output shape: {}".format(output.shape))
+
+        if include_report:
+            report = report_renderer.submit(downsampled_array, sample_array, output, result_id)
+        directory_name = "outputs-" + str(time.time())
+        audio_archive = create_zip_archive({
+            directory_name + "/track-custom-recording-high-res.wav": encode_wav(sample_array, VCTK_DATASET_SAMPLING_RATE),
+            directory_name + "/track-custom-recording-low-res.wav": encode_wav(downsampled_array, DOWNSAMPLED_RATE),
+            directory_name + "/track-custom-recording-super-res.wav": encode_wav(output, VCTK_DATASET_SAMPLING_RATE)
+        }).getvalue()
+        result_cache.put(result_id, audio_archive)
+
+    if not include_report:
+        return result_id, io.BytesIO(audio_archive)
+    if report is None:
+        report = submit_report_for_archive(result_id, audio_archive)
+    files = read_zip_archive(audio_archive)
+    directory_name = os.path.dirname(next(iter(files)))
+    files[directory_name + "/spectrograms-custom-recording.png"] = report.result()
+    return result_id, create_zip_archive(files)
+
+
+def submit_report_for_archive(result_id, audio_archive):
+    """
+    Renders the report of a cached result from the WAVs of its archive, unless the report itself is cached.
+    """
+    signals = {}
+    for archive_name, file_bytes in read_zip_archive(audio_archive).items():
+        for signal_name in ("low-res", "high-res", "super-res"):
+            if archive_name.endswith("-{}.wav".format(signal_name)):
+                signals[signal_name] = decode_wav(file_bytes)[1].astype(np.float32)
+    return report_renderer.submit(signals["low-res"], signals["high-res"], signals["super-res"], result_id)
+
+
+def is_report_requested():
+    return request.args.get("report", "true").lower() not in ("false", "0", "no")
+
+
+def run_super_resolution_job(report_progress, sample_array, include_report):
+    return super_resolve_custom_recording(sample_array, report_progress, include_report)[1].getvalue()
+
+
+job_queue = JobQueue(run_super_resolution_job)
+
+
+@app.route("/jobs", methods=["POST"])
+def submitJob():
+    """
+    Queues the super-resolution of a WAV sent either as a raw body or, like /upload, as a base64 data URL in JSON.
+    Returns the id of the job at once, or 429 when too many jobs are already waiting.
+    """
+    if request.mimetype == "application/json":
+        try:
+            wav_file = b64decode(request.get_json()['recordingAsBase64'].split("base64,")[1])
+        except (KeyError, IndexError, TypeError, AttributeError, ValueError):
+            return jsonify({"error": "Expected a JSON object whose recordingAsBase64 is a base64 data URL."}), 400
+    else:
+        wav_file = request.get_data()
+    try:
+        sample_rate, sample_array = decode_uploaded_recording(wav_file)
+    except ValueError as exception:
+        return jsonify({"error": str(exception)}), 400
+
+    try:
+        job_id = job_queue.submit(sample_array, is_report_requested())
+    except JobQueueFullError as exception:
+        return jsonify({"error": str(exception)}), 429, {"Retry-After": str(JOB_RETRY_AFTER)}
+    return jsonify({"id": job_id, "status_url": url_for("getJobStatus", job_id=job_id)}), 202
+
+
+@app.route("/jobs/<job_id>")
+def getJobStatus(job_id):
+    job_status = job_queue.get_status(job_id)
+    if job_status is None:
+        return jsonify({"error": "Unknown job."}), 404
+    job_status["id"] = job_id
+    if job_status["status"] == "done":
+        job_status["result_url"] = url_for("getJobResult", job_id=job_id)
+    return jsonify(job_status)
+
+
+@app.route("/jobs/<job_id>/result")
+def getJobResult(job_id):
+    job_status = job_queue.get_status(job_id)
+    if job_status is None:
+        return jsonify({"error": "Unknown job."}), 404
+    if job_status["status"] != "done":
+        return jsonify({"error": "The job is {}.".format(job_status["status"])}), 409
+    result = job_queue.get_result(job_id)
+    if result is None:
+        return jsonify({"error": "Unknown job."}), 404
+    return send_file(io.BytesIO(result), mimetype='zip', as_attachment=True,
+                     download_name="outputs-{}.zip".format(job_id))
+
+
+@app.route("/upload/stream", methods=["POST"])
+def uploadStreamAndPredict():
+    """
+    Accepts a raw audio/wav body or a multipart/form-data body whose first file is a WAV. The body is read from the
+    request stream block by block and the samples are downsampled and super-resolved while the upload is still
+    arriving. Returns the super-res WAV.
+    """
+    if request.mimetype == "multipart/form-data":
+        if "boundary" not in request.mimetype_params:
+            return jsonify({"error": "The multipart/form-data body has no boundary."}), 400
+        wav_blocks = iterate_multipart_file(iterate_stream_blocks(request.stream), request.mimetype_params["boundary"])
+    else:
+        wav_blocks = iterate_stream_blocks(request.stream)
+    wav_reader = BlockReader(wav_blocks)
+    try:
+        sample_rate, number_of_channels, data_size = read_wav_header(wav_reader)
+    except ValueError as exception:
+        return jsonify({"error": str(exception)}), 400
+    print("Sample rate of the streamed recording: {}, channels: {}".format(sample_rate, number_of_channels))
+    if sample_rate != VCTK_DATASET_SAMPLING_RATE:
+        return jsonify({"error": "The recording is sampled at {} Hz, {} Hz is expected.".format(
+            sample_rate, VCTK_DATASET_SAMPLING_RATE)}), 400
+
+    # Only the last window of the recording is padded, the scheduler batches the windows across requests.
+    streaming_super_resolver = StreamingSuperResolver(micro_batch_scheduler, batch_size=1)
+    low_resolution_blocks = iterate_downsampled_blocks(iterate_wav_samples(wav_reader, number_of_channels, data_size))
+    try:
+        high_resolution_blocks = list(streaming_super_resolver.stream(low_resolution_blocks))
+    except ValueError as exception:
+        # The rest of the body is parsed while the samples are super-resolved, so a malformed multipart body may
+        # only be detected here.
+        return jsonify({"error": str(exception)}), 400
+    output = np.concatenate(high_resolution_blocks) if len(high_resolution_blocks) > 0 else np.zeros(0)
+    print("Output shape: {}".format(output.shape))
 
-    print("Sample array length: {}".format(len(sample_array)))
-    print("Downsampled array length: {}".format(len(downsampled_array)))
+    return send_file(io.BytesIO(encode_wav(output, VCTK_DATASET_SAMPLING_RATE)), mimetype="audio/wav")
+
+
+@sock.route("/stream")
+def streamSuperResolution(websocket):
+    """
+    Live super-resolution over a WebSocket. The client sends binary messages of raw 16-bit little-endian low-res PCM
+    at DOWNSAMPLED_RATE, in frames of any length up to STREAM_MAX_FRAME_SAMPLES samples, and the text message
+    STREAM_END_MESSAGE once its stream is over. Every frame is answered with the high-res PCM that became final, if
+    any, followed by a JSON text message timing the frame; the real-time factor is the processing time over the
+    duration of the frame and must stay below 1 for the stream to keep up. The buffers of the connection live in its
+    own StreamingSuperResolver, so the algorithmic latency never exceeds LOW_RESOLUTION_DIMENSION - 1 low-res samples.
+    """
+    streaming_super_resolver = StreamingSuperResolver(micro_batch_scheduler, batch_size=1)
+    websocket.send(json.dumps({
+        "input_rate": DOWNSAMPLED_RATE,
+        "output_rate": VCTK_DATASET_SAMPLING_RATE,
+        "max_frame_samples": STREAM_MAX_FRAME_SAMPLES,
+        "max_algorithmic_latency": (LOW_RESOLUTION_DIMENSION - 1) / DOWNSAMPLED_RATE
+    }))
+
+    number_of_frames, total_processing_time, total_duration, max_real_time_factor = 0, 0.0, 0.0, 0.0
+    while True:
+        message = websocket.receive()
+        if isinstance(message, str):
+            if message == STREAM_END_MESSAGE:
+                break
+            websocket.send(json.dumps({"error": "Unknown control message: {}".format(message)}))
+            continue
+        try:
+            low_resolution_frame = decode_pcm(message)
+        except ValueError as exception:
+            websocket.send(json.dumps({"error": str(exception)}))
+            continue
+        if len(low_resolution_frame) > STREAM_MAX_FRAME_SAMPLES:
+            websocket.send(json.dumps({"error": "Frames are limited to {} samples.".format(STREAM_MAX_FRAME_SAMPLES)}))
+            continue
+
+        start_time = time.perf_counter()
+        high_resolution_block = streaming_super_resolver.process(low_resolution_frame)
+        processing_time = time.perf_counter() - start_time
+        frame_duration = len(low_resolution_frame) / DOWNSAMPLED_RATE
+        real_time_factor = processing_time / frame_duration if frame_duration > 0 else 0.0
+        number_of_frames += 1
+        total_processing_time += processing_time
+        total_duration += frame_duration
+        max_real_time_factor = max(max_real_time_factor, real_time_factor)
+
+        if high_resolution_block.size > 0:
+            websocket.send(encode_pcm(high_resolution_block))
+        websocket.send(json.dumps({
+            "frame": number_of_frames,
+            "input_samples": len(low_resolution_frame),
+            "output_samples": len(high_resolution_block),
+            "processing_time": processing_time,
+            "real_time_factor": real_time_factor,
+            "latency": streaming_super_resolver.get_number_of_held_back_samples() / VCTK_DATASET_SAMPLING_RATE
+        }))
+
+    start_time = time.perf_counter()
+    high_resolution_block = streaming_super_resolver.finish()
+    total_processing_time += time.perf_counter() - start_time
+    if high_resolution_block.size > 0:
+        websocket.send(encode_pcm(high_resolution_block))
+    websocket.send(json.dumps({
+        "frames": number_of_frames,
+        "duration": total_duration,
+        "processing_time": total_processing_time,
+        "real_time_factor": total_processing_time / total_duration if total_duration > 0 else 0.0,
+        "max_frame_real_time_factor": max_real_time_factor
+    }))
 
-    super_resolution_output_chunks = []
-
-    print("Cutting chunks from the downsampled audio (length={}) and feeding batches to the model...".format(
-        len(downsampled_array)))
-
-    for sample_index in range(0, len(downsampled_array), LOW_RESOLUTION_DIMENSION * BATCH_SIZE):
-        print("> Sample index {}".format(sample_index))
-        input_batch = []
-
-        for batch_sample_index in range(0, BATCH_SIZE):
-            print("--- Batch sample index {}".format(batch_sample_index))
-            if sample_index + (batch_sample_index + 1) * LOW_RESOLUTION_DIMENSION >= len(downsampled_array):
-                chunk = downsampled_array[sample_index + batch_sample_index * LOW_RESOLUTION_DIMENSION:]
-                zeroes_to_add = SAMPLE_DIMENSION // RESAMPLING_FACTOR - len(chunk)
-                array_of_zeroes = np.zeros(zeroes_to_add)
-                chunk = np.append(chunk, array_of_zeroes)
-                chunk = chunk.reshape((chunk.shape[0], 1))
-                print("Chunk shape (1):")
-                print(chunk.shape)
-            else:
-                chunk = downsampled_array[sample_index + batch_sample_index * LOW_RESOLUTION_DIMENSION:
-                                          sample_index + (batch_sample_index + 1) * LOW_RESOLUTION_DIMENSION]
-                print("Chunk shape (2):")
-                print(chunk.shape)
-            print(chunk)
-            input_batch.append(chunk)
-
-        print("> Feeding the low-res batch to the model...")
-        prediction = model.predict(np.array(input_batch))
-        super_resolution_output_chunks.append(prediction.reshape((prediction.shape[0] * prediction.shape[1])))
-        print("Prediction done. Output has been appended to the result.")
-
-    output = np.array([element for sublist in super_resolution_output_chunks for element in sublist])
-    print(output)
-    print("Output shape: {}".format(output.shape))
-    output = output[:sample_array.size]
-
-    downsampled_array = downsampled_array.reshape(downsampled_array.shape[0])
-    sample_array = sample_array.reshape(sample_array.shape[0])
-    low_resolution_signal_spectrogram = librosa.feature.melspectrogram(y=downsampled_array, sr=DOWNSAMPLED_RATE)
-    high_resolution_signal_spectrogram = librosa.feature.melspectrogram(y=sample_array, sr=VCTK_DATASET_SAMPLING_RATE)
-    super_resolution_signal_spectrogram = librosa.feature.melspectrogram(y=output, sr=VCTK_DATASET_SAMPLING_RATE)
-
-    print("Computed the spectrograms.")
-
-    fig, ax = plt.subplots(3, 1, figsize=(10, 10))
-    low_res_decibel_units = librosa.power_to_db(low_resolution_signal_spectrogram, ref=np.max)
-    high_res_decibel_units = librosa.power_to_db(high_resolution_signal_spectrogram, ref=np.max)
-    super_res_decibel_units = librosa.power_to_db(super_resolution_signal_spectrogram, ref=np.max)
-    ax[0].set_title("Low-res ({} samples)".format(downsampled_array.shape[0]))
-    first_subplot_spectrogram = librosa.display.specshow(low_res_decibel_units, x_axis='time',
-                                                         y_axis='mel', sr=DOWNSAMPLED_RATE, ax=ax[0])
-    ax[1].set_title("High-res ({} samples)".format(sample_array.shape[0]))
-    second_subplot_spectrogram = librosa.display.specshow(high_res_decibel_units, x_axis='time',
-                                                          y_axis='mel', sr=VCTK_DATASET_SAMPLING_RATE, ax=ax[1])
-    ax[2].set_title("Super-res ({} samples)".format(output.size))
-    third_subplot_spectrogram = librosa.display.specshow(super_res_decibel_units, x_axis='time',
-                                                         y_axis='mel', sr=VCTK_DATASET_SAMPLING_RATE, ax=ax[2])
-
-    fig.tight_layout()
-    fig.colorbar(third_subplot_spectrogram, ax=[ax[0], ax[1], ax[2]], format='%+2.0f dB')
-    directory_name = "outputs-" + str(time.time())
-    os.mkdir(directory_name)
-    plt.savefig(directory_name + "/spectrograms-custom-recording.png")
-    plt.show()
-
-    sf.write(directory_name + "/track-custom-recording-high-res.wav", np.int16(sample_array),
-             VCTK_DATASET_SAMPLING_RATE)
-    sf.write(directory_name + "/track-custom-recording-low-res.wav", np.int16(downsampled_array), DOWNSAMPLED_RATE)
-    sf.write(directory_name + "/track-custom-recording-super-res.wav", np.int16(output.reshape(output.shape)),
-             VCTK_DATASET_SAMPLING_RATE)
-
-    with ZipFile(directory_name + '.zip', 'w') as zip_archive:
-        zip_archive.write(directory_name + "/track-custom-recording-high-res.wav")
-        zip_archive.write(directory_name + "/track-custom-recording-low-res.wav")
-        zip_archive.write(directory_name + "/track-custom-recording-super-res.wav")
-        zip_archive.write(directory_name + "/spectrograms-custom-recording.png")
-        shutil.rmtree(directory_name + "/")
-
-    f = open(directory_name + ".zip", "rb")
-    zip_archive_as_string = f.read()
-
-    return zip_archive_as_string
 
 if __name__ == "__main__":
     app.run()
@@ -0,0 +1,188 @@
+import io
+import struct
+from zipfile import ZipFile
+import numpy as np
+import scipy.io.wavfile
+import soundfile as sf
+from werkzeug.sansio.multipart import MultipartDecoder, NeedData, Epilogue, File, Field, Data
+from constants import *
+
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def convert_to_int16(samples):
+    """
+    Rescales the samples scipy reads from 8/24/32-bit PCM or float WAV files to the int16 range of the recordings
+    the model was trained on. int16 samples are returned as they are, without a copy.
+    """
+    if samples.dtype == np.int16:
+        return samples
+    if np.issubdtype(samples.dtype, np.floating):
+        return np.clip(np.round(samples * 32768), -32768, 32767).astype(np.int16)
+    if samples.dtype == np.uint8:
+        return ((samples.astype(np.int16) - 128) << 8).astype(np.int16)
+    return (samples >> (8 * samples.dtype.itemsize - 16)).astype(np.int16)
+
+
+def decode_wav(wav_bytes):
+    """
+    Returns (sample_rate, samples) of a WAV file held in memory, the samples of its first channel as int16, like
+    iterate_wav_samples.
+    """
+    sample_rate, samples = scipy.io.wavfile.read(io.BytesIO(wav_bytes))
+    if samples.ndim > 1:
+        samples = samples[:, 0]
+    return sample_rate, convert_to_int16(samples)
+
+
+def encode_wav(sample_array, sample_rate):
+    """
+    Returns the bytes of a 16-bit PCM WAV file holding sample_array, rounded and clipped to the int16 range like
+    encode_pcm, so super-res samples beyond full scale saturate instead of wrapping around.
+    """
+    wav_buffer = io.BytesIO()
+    sample_array = np.asarray(sample_array)
+    if sample_array.dtype != np.int16:
+        sample_array = np.clip(np.round(sample_array), -32768, 32767).astype(np.int16)
+    sf.write(wav_buffer, sample_array, sample_rate, format="WAV", subtype="PCM_16")
+    return wav_buffer.getvalue()
+
+
+def decode_pcm(pcm_bytes):
+    """
+    Returns the int16 samples of raw little-endian 16-bit mono PCM, as sent by the streaming clients.
+    """
+    if len(pcm_bytes) % 2 != 0:
+        raise ValueError("Raw PCM frames must hold a whole number of 16-bit samples.")
+    return np.frombuffer(pcm_bytes, dtype="<i2")
+
+
+def encode_pcm(sample_array):
+    """
+    Returns sample_array as raw little-endian 16-bit mono PCM, clipped to the int16 range.
+    """
+    return np.clip(np.round(sample_array), -32768, 32767).astype("<i2").tobytes()
+
+
+def create_zip_archive(files):
+    """
+    Returns an in-memory zip archive holding files, a dict mapping every archive name to its bytes. The buffer is
+    rewound, so it can be handed to flask.send_file as it is.
+    """
+    zip_buffer = io.BytesIO()
+    with ZipFile(zip_buffer, "w") as zip_archive:
+        for archive_name, file_bytes in files.items():
+            zip_archive.writestr(archive_name, file_bytes)
+    zip_buffer.seek(0)
+    return zip_buffer
+
+
+def read_zip_archive(zip_bytes):
+    """
+    Inverse of create_zip_archive: returns a dict mapping every archive name to its bytes, in archive order.
+    """
+    with ZipFile(io.BytesIO(zip_bytes)) as zip_archive:
+        return {archive_name: zip_archive.read(archive_name) for archive_name in zip_archive.namelist()}
+
+
+def iterate_stream_blocks(stream, block_size=UPLOAD_STREAM_BLOCK_SIZE):
+    while True:
+        block = stream.read(block_size)
+        if not block:
+            return
+        yield block
+
+
+def iterate_multipart_file(blocks, boundary):
+    """
+    Yields the bytes of the first file of a multipart/form-data body while its blocks arrive, without buffering
+    the whole body the way request.files does.
+    """
+    decoder = MultipartDecoder(boundary.encode())
+    inside_file = False
+    for block in blocks:
+        decoder.receive_data(block)
+        event = decoder.next_event()
+        while not isinstance(event, NeedData):
+            if isinstance(event, Epilogue):
+                return
+            if isinstance(event, File):
+                inside_file = True
+            elif isinstance(event, Field):
+                inside_file = False
+            elif isinstance(event, Data) and inside_file:
+                if len(event.data) > 0:
+                    yield event.data
+                if not event.more_data:
+                    return
+            event = decoder.next_event()
+
+
+class BlockReader:
+    """
+    File-like read(size) over an iterator of byte blocks; only the bytes not consumed yet are buffered.
+    """
+    def __init__(self, blocks):
+        self.__blocks = iter(blocks)
+        self.__buffer = bytearray()
+
+    def read(self, size):
+        while len(self.__buffer) < size:
+            block = next(self.__blocks, None)
+            if block is None:
+                break
+            self.__buffer += block
+        data = bytes(self.__buffer[:size])
+        del self.__buffer[:size]
+        return data
+
+
+def read_wav_header(reader):
+    """
+    Reads the chunks of a WAV stream up to the start of its samples and returns (sample_rate, number_of_channels,
+    data_size). Only 16-bit PCM is supported. A data_size of 0 or 0xFFFFFFFF (written by recorders that stream
+    the file) means that the samples run until the end of the stream.
+    """
+    riff_header = reader.read(12)
+    if len(riff_header) < 12 or riff_header[0:4] != b"RIFF" or riff_header[8:12] != b"WAVE":
+        raise ValueError("The upload is not a RIFF/WAVE file.")
+
+    wav_format = None
+    while True:
+        chunk_header = reader.read(8)
+        if len(chunk_header) < 8:
+            raise ValueError("The WAV file has no data chunk.")
+        chunk_id, chunk_size = struct.unpack("<4sI", chunk_header)
+        if chunk_id == b"data":
+            if wav_format is None:
+                raise ValueError("The WAV file has no fmt chunk before its data chunk.")
+            return wav_format[0], wav_format[1], chunk_size
+        chunk = reader.read(chunk_size + chunk_size % 2)
+        if chunk_id == b"fmt ":
+            audio_format, number_of_channels, sample_rate, _, _, bits_per_sample = struct.unpack("<HHIIHH", chunk[:16])
+            if audio_format == WAVE_FORMAT_EXTENSIBLE and len(chunk) >= 26:
+                audio_format = struct.unpack("<H", chunk[24:26])[0]
+            if audio_format != WAVE_FORMAT_PCM or bits_per_sample != 16:
+                raise ValueError("Only 16-bit PCM WAV files are supported.")
+            wav_format = (sample_rate, number_of_channels)
+
+
+def iterate_wav_samples(reader, number_of_channels, data_size, block_size=UPLOAD_STREAM_BLOCK_SIZE):
+    """
+    Yields the first channel of the data chunk as int16 blocks while the bytes arrive.
+    """
+    frame_size = 2 * number_of_channels
+    bounded = data_size not in (0, 0xFFFFFFFF)
+    remaining_bytes = data_size
+    leftover = b""
+    while not bounded or remaining_bytes > 0:
+        block = reader.read(min(block_size, remaining_bytes) if bounded else block_size)
+        if len(block) == 0:
+            return
+        remaining_bytes -= len(block)
+        block = leftover + block
+        complete_length = len(block) - len(block) % frame_size
+        leftover = block[complete_length:]
+        if complete_length > 0:
+            yield np.frombuffer(block[:complete_length], dtype="<i2").reshape(-1, number_of_channels)[:, 0]
@@ -0,0 +1,158 @@
+import argparse
+import csv
+import datetime
+import glob
+import importlib.util
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import numpy as np
+from benchmark_import_time import get_commit
+from constants import *
+
+RESULT_FIELDS = ["commit", "date", "variant", "batch_size", "parameters", "flops_per_chunk", "latency", "throughput",
+                 "peak_memory"]
+
+
+def find_variants():
+    return sorted(glob.glob("model-*.py")) + ["model.py"]
+
+
+def load_variant(script_path):
+    """
+    Imports an architecture script by path (the variants have dashes in their names) with plot_model disabled, so
+    building a model does not need graphviz nor overwrite the model_stage_*.png files.
+    """
+    specification = importlib.util.spec_from_file_location("variant", script_path)
+    variant = importlib.util.module_from_spec(specification)
+    specification.loader.exec_module(variant)
+    variant.plot_model = lambda *args, **kwargs: None
+    return variant
+
+
+def count_flops(model):
+    """
+    Floating-point operations of one forward pass of the fixed-shape model, counted by the TensorFlow profiler on
+    the frozen graph (a multiply-add counts as two operations).
+    """
+    import tensorflow as tf
+    from tensorflow.python.framework.convert_to_constants import convert_variables_to_constants_v2
+    forward = tf.function(lambda input_batch: model(input_batch, training=False))
+    concrete_function = forward.get_concrete_function(tf.TensorSpec(model.input_shape, tf.float32))
+    frozen_function = convert_variables_to_constants_v2(concrete_function)
+    profile = tf.compat.v1.profiler.profile(frozen_function.graph,
+                                            options=tf.compat.v1.profiler.ProfileOptionBuilder.float_operation())
+    return profile.total_float_ops
+
+
+def benchmark_variant(script_path, batch_size, number_of_repetitions=ARCHITECTURE_BENCHMARK_NUMBER_OF_REPETITIONS):
+    """
+    Builds a variant for batch_size and returns its parameter count, its FLOPs per chunk, the median latency of a
+    warm batch, the throughput in audio-seconds per second and the peak resident memory of the process in MB. Meant
+    to run in a fresh process per variant and batch size, so that the peak memory is the one of this model alone.
+    """
+    from CompiledInference import CompiledInference
+    model = load_variant(script_path).create_model(batch_size=batch_size)
+    compiled_inference = CompiledInference(model, batch_size)
+    input_batch = np.random.default_rng(0).normal(0, TRAINING_SET_STD, (batch_size, LOW_RESOLUTION_DIMENSION, 1))
+    input_batch = input_batch.astype(np.float32)
+
+    compiled_inference.predict(input_batch)
+    durations = []
+    for _ in range(number_of_repetitions):
+        start_time = time.perf_counter()
+        compiled_inference.predict(input_batch)
+        durations.append(time.perf_counter() - start_time)
+    latency = float(np.median(durations))
+
+    return {
+        "variant": os.path.splitext(os.path.basename(script_path))[0],
+        "batch_size": batch_size,
+        "parameters": model.count_params(),
+        "flops_per_chunk": count_flops(model) // batch_size,
+        "latency": latency,
+        "throughput": batch_size * SAMPLE_DIMENSION / VCTK_DATASET_SAMPLING_RATE / latency,
+        # ru_maxrss is in kilobytes on Linux.
+        "peak_memory": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    }
+
+
+def run_benchmarks(variants, batch_sizes, number_of_repetitions):
+    """
+    Benchmarks every variant at every batch size, each in its own CPU-only subprocess, and returns the result rows.
+    """
+    environment = dict(os.environ, CUDA_VISIBLE_DEVICES="-1", TF_CPP_MIN_LOG_LEVEL="2")
+    commit, date = get_commit(), datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    results = []
+    for script_path in variants:
+        for batch_size in batch_sizes:
+            completed_process = subprocess.run(
+                [sys.executable, __file__, "--variant", script_path, "--batch-size", str(batch_size),
+                 "--repetitions", str(number_of_repetitions)],
+                env=environment, capture_output=True, text=True)
+            if completed_process.returncode != 0:
+                error_lines = completed_process.stderr.strip().splitlines()
+                print("{} (batch size {}): failed ({})".format(script_path, batch_size,
+                                                               error_lines[-1] if error_lines else "no output"))
+                continue
+            result = dict(json.loads(completed_process.stdout.strip().splitlines()[-1]), commit=commit, date=date)
+            results.append(result)
+            print("{:<52} batch {:>3}  {:>10} params  {:>8.2f} MFLOPs/chunk  {:>8.2f} ms  {:>8.1f} audio-s/s  "
+                  "{:>7.0f} MB".format(result["variant"], batch_size, result["parameters"],
+                                       result["flops_per_chunk"] / 1e6, result["latency"] * 1000,
+                                       result["throughput"], result["peak_memory"]))
+    return results
+
+
+def append_results(results, results_path=ARCHITECTURE_BENCHMARK_RESULTS_PATH):
+    write_header = not os.path.exists(results_path)
+    with open(results_path, "a", newline="") as results_file:
+        writer = csv.DictWriter(results_file, fieldnames=RESULT_FIELDS)
+        if write_header:
+            writer.writeheader()
+        writer.writerows(results)
+
+
+def compare_commits(base_commit, head_commit, results_path=ARCHITECTURE_BENCHMARK_RESULTS_PATH):
+    """
+    Prints the latency, throughput and peak memory of head_commit relative to base_commit, for every variant and
+    batch size benchmarked at both commits (the latest run of each commit is used).
+    """
+    latest_results = {}
+    with open(results_path, newline="") as results_file:
+        for row in csv.DictReader(results_file):
+            latest_results[(row["commit"], row["variant"], int(row["batch_size"]))] = row
+
+    for (commit, variant, batch_size), base in sorted(latest_results.items()):
+        head = latest_results.get((head_commit, variant, batch_size))
+        if commit != base_commit or head is None:
+            continue
+        print("{:<52} batch {:>3}  latency {:>6.2f}x  throughput {:>6.2f}x  peak memory {:>+8.0f} MB".format(
+            variant, batch_size, float(head["latency"]) / float(base["latency"]),
+            float(head["throughput"]) / float(base["throughput"]),
+            float(head["peak_memory"]) - float(base["peak_memory"])))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks the inference cost of the model-*.py architectures.")
+    parser.add_argument("--variants", nargs="+", default=None, help="architecture scripts, all of them by default")
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=ARCHITECTURE_BENCHMARK_BATCH_SIZES)
+    parser.add_argument("--repetitions", type=int, default=ARCHITECTURE_BENCHMARK_NUMBER_OF_REPETITIONS)
+    parser.add_argument("--compare", nargs=2, metavar=("BASE_COMMIT", "HEAD_COMMIT"),
+                        help="compare two commits already recorded in the results instead of benchmarking")
+    # Used by run_benchmarks to measure a single variant and batch size in a fresh process.
+    parser.add_argument("--variant", help=argparse.SUPPRESS)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help=argparse.SUPPRESS)
+    arguments = parser.parse_args()
+
+    if arguments.variant is not None:
+        print(json.dumps(benchmark_variant(arguments.variant, arguments.batch_size, arguments.repetitions)))
+    elif arguments.compare is not None:
+        compare_commits(*arguments.compare)
+    else:
+        results = run_benchmarks(arguments.variants or find_variants(), arguments.batch_sizes, arguments.repetitions)
+        append_results(results)
+        print("Appended {} results to {}".format(len(results), ARCHITECTURE_BENCHMARK_RESULTS_PATH))
@@ -0,0 +1,64 @@
+import ast
+import datetime
+import json
+import subprocess
+import sys
+import time
+import numpy as np
+from constants import *
+
+
+def extract_top_level_imports(script_path):
+    """
+    Returns the source of the top-level import statements of a script, so that its cold start can be measured
+    without running the script itself (training, serving...).
+    """
+    with open(script_path) as script_file:
+        source = script_file.read()
+    return "\n".join(ast.get_source_segment(source, node) for node in ast.parse(source).body
+                     if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def measure_import_time(import_source, number_of_runs=IMPORT_BENCHMARK_NUMBER_OF_RUNS):
+    """
+    Runs the imports in number_of_runs fresh interpreters and returns the median wall time in seconds, along with
+    the five slowest top-level modules reported by -X importtime in the last run.
+    """
+    durations = []
+    for _ in range(number_of_runs):
+        start_time = time.perf_counter()
+        completed_process = subprocess.run([sys.executable, "-X", "importtime", "-c", import_source],
+                                           stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+        durations.append(time.perf_counter() - start_time)
+
+    # -X importtime lines: "import time: <self us> | <cumulative us> | <module>", nested modules are indented.
+    top_level_modules = []
+    for line in completed_process.stderr.splitlines():
+        fields = line.split("|")
+        if len(fields) == 3 and fields[1].strip().isdigit() and not fields[2].startswith("  "):
+            top_level_modules.append((fields[2].strip(), int(fields[1]) / 1e6))
+    slowest_modules = sorted(top_level_modules, key=lambda module: module[1], reverse=True)[:5]
+    return float(np.median(durations)), slowest_modules
+
+
+def get_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == "__main__":
+    results = {"date": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "commit": get_commit(), "scripts": {}}
+    for script_path in IMPORT_BENCHMARK_SCRIPTS:
+        median_duration, slowest_modules = measure_import_time(extract_top_level_imports(script_path))
+        results["scripts"][script_path] = {"median_import_time": median_duration, "slowest_modules": slowest_modules}
+        print("{}: {:.3f} s".format(script_path, median_duration))
+        for module, cumulative_duration in slowest_modules:
+            print("    {:<40} {:.3f} s".format(module, cumulative_duration))
+
+    # Every run is appended, so the cold-start times can be followed from commit to commit.
+    with open(IMPORT_BENCHMARK_RESULTS_PATH, "a") as results_file:
+        results_file.write(json.dumps(results) + "\n")
+    print("Appended the results to {}".format(IMPORT_BENCHMARK_RESULTS_PATH))
@@ -0,0 +1,51 @@
+import os
+import time
+import numpy as np
+from model import create_model
+from CompiledInference import CompiledInference
+from inference import super_resolve
+from constants import *
+
+
+def measure_throughput(model, downsampled_array, batches_per_prediction=NUMBER_OF_BATCHES_PER_PREDICTION,
+                       number_of_repetitions=BENCHMARK_NUMBER_OF_REPETITIONS):
+    """
+    Returns the median number of high-res samples produced per second by super_resolve over number_of_repetitions
+    runs, after one warm-up run on a single batch.
+    """
+    super_resolve(model, downsampled_array[:BATCH_SIZE * LOW_RESOLUTION_DIMENSION],
+                  batches_per_prediction=batches_per_prediction)
+    durations = []
+    for _ in range(number_of_repetitions):
+        start_time = time.perf_counter()
+        super_resolve(model, downsampled_array, batches_per_prediction=batches_per_prediction)
+        durations.append(time.perf_counter() - start_time)
+    return len(downsampled_array) * RESAMPLING_FACTOR / np.median(durations)
+
+
+if __name__ == "__main__":
+    model = create_model(plot=False)
+    # The weights do not change the speed, but the trained ones are used when they are available.
+    if os.path.exists(MODEL_PATH):
+        model.load_weights(MODEL_PATH)
+    downsampled_array = np.random.default_rng(0).normal(0, TRAINING_SET_STD, DOWNSAMPLED_RATE * BENCHMARK_SIGNAL_DURATION)
+    downsampled_array = downsampled_array.astype(np.float32)
+
+    throughputs = {}
+    print("Benchmarking {} seconds of low-res audio, {} repetitions per path...".format(
+        BENCHMARK_SIGNAL_DURATION, BENCHMARK_NUMBER_OF_REPETITIONS))
+    # The previous path of predict.py: a model compiled with run_eagerly=True and one model.predict call per batch.
+    model.compile(loss="mean_squared_error", optimizer="Adam", run_eagerly=True)
+    throughputs["eager model.predict per batch"] = measure_throughput(model, downsampled_array,
+                                                                      batches_per_prediction=1)
+    model.compile(loss="mean_squared_error", optimizer="Adam")
+    throughputs["model.predict per batch"] = measure_throughput(model, downsampled_array, batches_per_prediction=1)
+    throughputs["model.predict"] = measure_throughput(model, downsampled_array)
+    throughputs["CompiledInference"] = measure_throughput(CompiledInference(model), downsampled_array)
+    throughputs["CompiledInference (XLA)"] = measure_throughput(CompiledInference(model, jit_compile=True),
+                                                                downsampled_array)
+
+    baseline_throughput = throughputs["eager model.predict per batch"]
+    for path, throughput in throughputs.items():
+        print("{:<32} {:>12.0f} samples/s  {:>8.2f}x real time  {:>6.2f}x speed-up".format(
+            path, throughput, throughput / VCTK_DATASET_SAMPLING_RATE, throughput / baseline_throughput))
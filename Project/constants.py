@@ -1,4 +1,7 @@
 import os
+import json
+from functools import lru_cache
+import numpy as np
 VCTK_DATASET_SAMPLING_RATE = 48000
 RESAMPLING_FACTOR = 4
 STAGE = 10
@@ -11,20 +14,124 @@ OVERLAP = 2048
 LOW_RESOLUTION_DIMENSION = int(SAMPLE_DIMENSION / RESAMPLING_FACTOR)
 LEARNING_RATE = 0.0001
 NUMBER_OF_EPOCHS = 100
-NUMBER_OF_FILES = len(os.listdir("preprocessed_dataset/low_res/")) # The data that is used is from the set of chunks generated from the first 1000 tracks, which contains approximately 65000 pairs of low-res/high-res patches of 1200/4800 samples
 AMOUNT_OF_TRACKS_USED_FOR_DATA_GENERATION = 1000
+PAIR_GENERATION_MODE = "shards"  # "shards" stores the pairs on disk, "on_the_fly" cuts them from the waveform corpus
+SHARDED_DATASET_DIRECTORY = "preprocessed_dataset/shards/"
+SHARD_MANIFEST_FILENAME = "manifest.json"
+WAVEFORM_CORPUS_DIRECTORY = "preprocessed_dataset/waveforms/"
+WAVEFORM_CORPUS_SAMPLES_FILENAME = "samples.int16"
+WAVEFORM_CORPUS_TRACKS_FILENAME = "tracks.npy"
+VCTK_CORPUS_DIRECTORY = "preprocessed_dataset/vctk/"  # Every VCTK recording, written by index_vctk.py
+DATASET_STATISTICS_PATH = "preprocessed_dataset/statistics.json"
+
+
+LEGACY_DATASET_DIRECTORY = "preprocessed_dataset/low_res/"
+LEGACY_DATASET_SIZE_CACHE_PATH = "preprocessed_dataset/low_res_size.json"
 TRAINING_DATA_SPLIT_PERCENTAGE = 0.8
 VALIDATION_DATA_SPLIT_PERCENTAGE = 0.1
 TESTING_DATA_SPLIT_PERCENTAGE = 0.1
-NUMBER_OF_TRAINING_TENSORS = int(TRAINING_DATA_SPLIT_PERCENTAGE * NUMBER_OF_FILES)
-NUMBER_OF_VALIDATION_TENSORS = int(VALIDATION_DATA_SPLIT_PERCENTAGE * NUMBER_OF_FILES)
-NUMBER_OF_TESTING_TENSORS = int(TESTING_DATA_SPLIT_PERCENTAGE * NUMBER_OF_FILES)
+
+
+# The dataset sizes are functions rather than constants: they are read from disk, and every module star-imports this
+# one, so computing them here would make every script (the app included) pay for it at import time.
+@lru_cache(maxsize=None)
+def get_number_of_files():
+    """
+    Number of low-res/high-res pairs in the dataset (the set of chunks generated from the first
+    AMOUNT_OF_TRACKS_USED_FOR_DATA_GENERATION tracks), resolved on first use. It comes from the shard manifest,
+    from the waveform corpus track table or, for the legacy one-file-per-pair layout, from a size cache that is only
+    refreshed when the directory changes. A missing dataset has no pairs.
+    """
+    if PAIR_GENERATION_MODE == "on_the_fly":
+        tracks_path = os.path.join(WAVEFORM_CORPUS_DIRECTORY, WAVEFORM_CORPUS_TRACKS_FILENAME)
+        if not os.path.exists(tracks_path):
+            return 0
+        track_lengths = np.load(tracks_path, mmap_mode="r")["length"][:AMOUNT_OF_TRACKS_USED_FOR_DATA_GENERATION]
+        track_lengths = track_lengths - track_lengths % RESAMPLING_FACTOR
+        return int(np.maximum(0, -(-(track_lengths - SAMPLE_DIMENSION) // OVERLAP)).sum())
+
+    manifest_path = os.path.join(SHARDED_DATASET_DIRECTORY, SHARD_MANIFEST_FILENAME)
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as manifest_file:
+            return json.load(manifest_file)["number_of_records"]
+
+    if not os.path.isdir(LEGACY_DATASET_DIRECTORY):
+        return 0
+    modification_time = os.stat(LEGACY_DATASET_DIRECTORY).st_mtime
+    if os.path.exists(LEGACY_DATASET_SIZE_CACHE_PATH):
+        with open(LEGACY_DATASET_SIZE_CACHE_PATH) as size_cache_file:
+            size_cache = json.load(size_cache_file)
+        if size_cache["modification_time"] == modification_time:
+            return size_cache["number_of_files"]
+    with os.scandir(LEGACY_DATASET_DIRECTORY) as directory_entries:
+        number_of_files = sum(1 for _ in directory_entries)
+    with open(LEGACY_DATASET_SIZE_CACHE_PATH, "w") as size_cache_file:
+        json.dump({"modification_time": modification_time, "number_of_files": number_of_files}, size_cache_file)
+    return number_of_files
+
+
+def get_number_of_training_tensors():
+    return int(TRAINING_DATA_SPLIT_PERCENTAGE * get_number_of_files())
+
+
+def get_number_of_validation_tensors():
+    return int(VALIDATION_DATA_SPLIT_PERCENTAGE * get_number_of_files())
+
+
+def get_number_of_testing_tensors():
+    return int(TESTING_DATA_SPLIT_PERCENTAGE * get_number_of_files())
+
+
 BATCH_SIZE = 16  # The number of input tensors should be divisible by the batch size
+RECORDS_PER_READ = 256  # Records read from a shard at once by the training input pipeline
+NUMBER_OF_PARALLEL_READS = 4
+SHUFFLE_BUFFER_SIZE = 8192  # Records held in the training shuffle buffer
+INPUT_PIPELINE_CACHE_DIRECTORY = "preprocessed_dataset/tf-data-cache/"  # Caches are named after a dataset fingerprint
+NUMBER_OF_BATCHES_PER_PREDICTION = 64  # Batches handed to a single model.predict call during inference
 CHECKPOINT_PATH = "checkpoints/checkpoint-epoch-{epoch:04d}-mse_validation_loss-{val_loss:10f}-nrmse_val-{" \
                   "val_normalised_root_mean_squared_error_validation:10f}.ckpt"
 CHECKPOINT_DIRECTORY = os.path.dirname(CHECKPOINT_PATH)
 NUMBER_OF_PROCESSES = 4
+NUMBER_OF_BASELINE_WORKERS = os.cpu_count() or 1
+BASELINE_BLOCK_SIZE = 1024  # Patches upsampled by a single matrix product in the interpolation baselines
 AMOUNT_OF_TRACKS_IN_A_DATA_GENERATION_BATCH = 1000
+AMOUNT_OF_TRACKS_IN_A_STATISTICS_GROUP = 10  # Tracks whose statistics are collected together in on-the-fly mode
+MODELS_DIRECTORY = "models/"
+MODEL_RELOAD_POLL_INTERVAL = 10  # Seconds between two scans of MODELS_DIRECTORY for newer weights
+MODEL_LOADING_TIMEOUT = 120  # Seconds a request waits for the model to become ready
+MODEL_LENGTH_MULTIPLE = 64  # 2 ** the number of stride-2 convolutions: the input length of a dynamic-shape model
+SAVED_MODEL_DIRECTORY = "models/saved_model/"
+INFERENCE_BACKEND = "compiled"  # "keras" (model.predict), "compiled" (CompiledInference), "tflite-float16" or "tflite-int8"
+INFERENCE_JIT_COMPILE = False  # Compiles the inference function with XLA
+TFLITE_MODEL_PATH = "models/model_{}.tflite"  # Formatted with the quantization, "float16" or "int8"
+TFLITE_NUMBER_OF_THREADS = os.cpu_count() or 1
+TFLITE_NUMBER_OF_CALIBRATION_BATCHES = 32  # Training batches used to calibrate the int8 quantization
+TFLITE_NUMBER_OF_EVALUATION_BATCHES = 64  # Testing batches used to compare the TFLite models with the float model
+BENCHMARK_SIGNAL_DURATION = 60  # Seconds of low-res audio super-resolved by benchmark_inference.py
+BENCHMARK_NUMBER_OF_REPETITIONS = 5
+UPLOAD_STREAM_BLOCK_SIZE = 64 * 1024  # Bytes read from the request stream at once by the streaming upload
+NUMBER_OF_JOB_WORKERS = 2  # Jobs super-resolved at once by the job API
+MAX_QUEUED_JOBS = 16  # Jobs waiting for a worker before POST /jobs is refused
+JOB_RESULT_TIME_TO_LIVE = 3600  # Seconds the result of a finished job is kept
+JOB_RESULT_BYTE_BUDGET = 256 * 2 ** 20  # Bytes of finished job results kept before the oldest ones are dropped
+JOB_RETRY_AFTER = 30  # Seconds a client is told to wait when the job queue is full
+RESULT_CACHE_BYTE_BUDGET = 512 * 2 ** 20  # Bytes of results kept by the result cache
+RESULT_CACHE_TIME_TO_LIVE = 24 * 3600  # Seconds a cached result is served
+RESULT_CACHE_CLEANUP_INTERVAL = 60  # Seconds between two removals of the expired results
+NUMBER_OF_REPORT_WORKERS = 2  # Threads rendering spectrogram reports
+REPORT_CACHE_BYTE_BUDGET = 64 * 2 ** 20  # Bytes of rendered reports kept in memory
+SPECTROGRAM_NUMBER_OF_FFT_POINTS = 2048
+IMPORT_BENCHMARK_SCRIPTS = ["app.py", "training.py", "testing.py"]
+IMPORT_BENCHMARK_NUMBER_OF_RUNS = 5
+IMPORT_BENCHMARK_RESULTS_PATH = "import-time-benchmark.jsonl"
+STREAM_END_MESSAGE = "end"  # Text message a WebSocket client sends to flush the last samples of its stream
+STREAM_MAX_FRAME_SAMPLES = DOWNSAMPLED_RATE  # Low-res samples accepted in one WebSocket frame
+BATCH_AUDIO_EXTENSIONS = (".wav", ".flac")  # Files picked up by super_resolve_directory.py
+BATCH_NUMBER_OF_WORKERS = 2 * (os.cpu_count() or 1)  # Files super_resolve_directory.py decodes and writes at once
+ARCHITECTURE_BENCHMARK_BATCH_SIZES = [1, 4, 8, 16, 32, 64]
+ARCHITECTURE_BENCHMARK_NUMBER_OF_REPETITIONS = 20  # Timed batches per variant and batch size, after a warm-up batch
+ARCHITECTURE_BENCHMARK_RESULTS_PATH = "architecture-benchmark.csv"
+MICRO_BATCH_MAX_WAIT = 0.01  # Seconds the oldest queued chunk waits for other requests to fill up its batch
 MODEL_PATH = "models/model_stage_8_version_1_resampling_factor_4_overlap_2048_sample_dimension_4096_epochs_100_batch_size_16_learning_rate_0.0001_data_split_61883_7735_7735.h5"
 
 TRAINING_SET_MEAN = -0.08101532
@@ -0,0 +1,47 @@
+import sys
+import numpy as np
+import tensorflow as tf
+from model import create_model, create_dynamic_model
+from constants import *
+
+
+def export_saved_model(model, export_directory=SAVED_MODEL_DIRECTORY):
+    """
+    Exports a dynamic-shape model as a SavedModel with two signatures:
+    - serving_default: a whole 1-D low-res signal of any length, returned as one high-res signal (the padding to a
+      multiple of MODEL_LENGTH_MULTIPLE happens inside the graph);
+    - chunks: a (batch, length, 1) batch of low-res chunks, with the length a multiple of MODEL_LENGTH_MULTIPLE.
+    """
+    @tf.function(input_signature=[tf.TensorSpec([None], tf.float32, name="low_resolution_signal")])
+    def super_resolve_signal(low_resolution_signal):
+        length = tf.shape(low_resolution_signal)[0]
+        padded_signal = tf.pad(low_resolution_signal, [[0, (-length) % MODEL_LENGTH_MULTIPLE]])
+        output = model(padded_signal[tf.newaxis, :, tf.newaxis], training=False)
+        return {"high_resolution_signal": tf.reshape(output, [-1])[:length * RESAMPLING_FACTOR]}
+
+    @tf.function(input_signature=[tf.TensorSpec([None, None, 1], tf.float32, name="low_resolution_chunks")])
+    def super_resolve_chunks(low_resolution_chunks):
+        return {"high_resolution_chunks": model(low_resolution_chunks, training=False)}
+
+    tf.saved_model.save(model, export_directory, signatures={
+        "serving_default": super_resolve_signal,
+        "chunks": super_resolve_chunks
+    })
+
+
+if __name__ == "__main__":
+    weights_path = sys.argv[1] if len(sys.argv) > 1 else MODEL_PATH
+    print("Loading the weights from {} into the dynamic-shape model...".format(weights_path))
+    dynamic_model = create_dynamic_model(weights_path)
+
+    # The dynamic-shape build must give the same predictions as the fixed-shape one for the shapes both accept.
+    fixed_model = create_model(plot=False)
+    fixed_model.load_weights(weights_path)
+    test_batch = np.random.default_rng(0).normal(0, TRAINING_SET_STD, size=(BATCH_SIZE, LOW_RESOLUTION_DIMENSION, 1))
+    test_batch = test_batch.astype(np.float32)
+    difference = np.max(np.abs(fixed_model.predict(test_batch, batch_size=BATCH_SIZE, verbose=0)
+                               - dynamic_model.predict(test_batch, batch_size=BATCH_SIZE, verbose=0)))
+    print("Maximum difference between the fixed-shape and the dynamic-shape model: {}".format(difference))
+
+    export_saved_model(dynamic_model, SAVED_MODEL_DIRECTORY)
+    print("Exported the SavedModel to {}".format(SAVED_MODEL_DIRECTORY))
@@ -0,0 +1,56 @@
+import sys
+import time
+import numpy as np
+from model import create_model
+from TFLiteInference import TFLiteInference, convert_to_tflite
+from DatasetGenerator import DatasetGenerator
+import numpy_metrics
+from constants import *
+
+
+def evaluate(model, low_resolution_batch, high_resolution_batch):
+    start_time = time.perf_counter()
+    prediction = model.predict(low_resolution_batch, batch_size=BATCH_SIZE, verbose=0)
+    duration = time.perf_counter() - start_time
+    return {
+        "signal_to_noise_ratio": float(np.mean(numpy_metrics.signal_to_noise_ratio(high_resolution_batch, prediction))),
+        "normalised_root_mean_squared_error": float(np.mean(
+            numpy_metrics.normalised_root_mean_squared_error_testing(high_resolution_batch, prediction))),
+        "samples_per_second": prediction.size / duration
+    }
+
+
+if __name__ == "__main__":
+    weights_path = sys.argv[1] if len(sys.argv) > 1 else MODEL_PATH
+    print("Loading the weights from {}...".format(weights_path))
+    model = create_model(plot=False)
+    model.load_weights(weights_path)
+
+    records = DatasetGenerator.open_dataset()
+    _, _, (testing_start, _) = DatasetGenerator.split_records(len(records))
+    low_resolution_batch, high_resolution_batch, _ = records.read(
+        testing_start, testing_start + TFLITE_NUMBER_OF_EVALUATION_BATCHES * BATCH_SIZE)
+    low_resolution_batch = low_resolution_batch.astype(np.float32)
+    high_resolution_batch = high_resolution_batch.astype(np.float32)
+
+    float_results = evaluate(model, low_resolution_batch, high_resolution_batch)
+    print("float32: SNR {:.4f}, NRMSE {:.6f}, {:.0f} samples/s".format(
+        float_results["signal_to_noise_ratio"], float_results["normalised_root_mean_squared_error"],
+        float_results["samples_per_second"]))
+
+    for quantization in ("float16", "int8"):
+        print("Converting the model to TFLite ({})...".format(quantization))
+        model_content = convert_to_tflite(model, quantization)
+        with open(TFLITE_MODEL_PATH.format(quantization), "wb") as model_file:
+            model_file.write(model_content)
+        print("Wrote {} ({:.1f} MB)".format(TFLITE_MODEL_PATH.format(quantization), len(model_content) / 2 ** 20))
+
+        results = evaluate(TFLiteInference(model_content), low_resolution_batch, high_resolution_batch)
+        print("{}: SNR {:.4f} ({:+.4f}), NRMSE {:.6f} ({:+.6f}), {:.0f} samples/s ({:.2f}x)".format(
+            quantization,
+            results["signal_to_noise_ratio"],
+            results["signal_to_noise_ratio"] - float_results["signal_to_noise_ratio"],
+            results["normalised_root_mean_squared_error"],
+            results["normalised_root_mean_squared_error"] - float_results["normalised_root_mean_squared_error"],
+            results["samples_per_second"],
+            results["samples_per_second"] / float_results["samples_per_second"]))
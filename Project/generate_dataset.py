@@ -1,4 +1,10 @@
 from DatasetGenerator import DatasetGenerator
+from constants import PAIR_GENERATION_MODE
 
-dataset_generator = DatasetGenerator()
-dataset_generator.generate_dataset()
+# The generation workers are spawned and re-import this module, so the work must only start in the parent process
+if __name__ == "__main__":
+    dataset_generator = DatasetGenerator()
+    if PAIR_GENERATION_MODE == "on_the_fly":
+        dataset_generator.generate_waveform_corpus()
+    else:
+        dataset_generator.generate_dataset()
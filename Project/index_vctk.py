@@ -0,0 +1,4 @@
+from DatasetGenerator import DatasetGenerator
+
+dataset_generator = DatasetGenerator()
+dataset_generator.index_vctk()
@@ -0,0 +1,88 @@
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+from constants import *
+
+
+def downsample(sample_array, resampling_factor=RESAMPLING_FACTOR):
+    sample_array = np.asarray(sample_array).reshape(-1)
+    sample_array_length = len(sample_array)
+    sample_array = sample_array[:sample_array_length - (sample_array_length % resampling_factor)]
+    return sample_array, sample_array[0::resampling_factor]
+
+
+def iterate_downsampled_blocks(sample_blocks, resampling_factor=RESAMPLING_FACTOR):
+    """
+    Streaming counterpart of downsample: yields the decimated samples of a signal that arrives in blocks of any
+    length. Like downsample, the trailing samples that do not fill a whole resampling_factor group are dropped.
+    """
+    leftover = np.zeros(0, dtype=np.int16)
+    for sample_block in sample_blocks:
+        sample_block = np.concatenate([leftover, np.asarray(sample_block).reshape(-1)])
+        complete_length = len(sample_block) - len(sample_block) % resampling_factor
+        leftover = sample_block[complete_length:]
+        if complete_length > 0:
+            yield sample_block[:complete_length:resampling_factor]
+
+
+def frame_signal(signal, frame_length=LOW_RESOLUTION_DIMENSION):
+    """
+    Returns a read-only (number_of_chunks, frame_length, 1) view over the complete, non-overlapping chunks of a
+    1-D signal. The trailing samples that do not fill a whole chunk are left out.
+    """
+    signal = np.ascontiguousarray(signal).reshape(-1)
+    number_of_chunks = len(signal) // frame_length
+    stride = signal.strides[0]
+    return as_strided(signal, shape=(number_of_chunks, frame_length, 1),
+                      strides=(frame_length * stride, stride, stride), writeable=False)
+
+
+def super_resolve(model, downsampled_array, batch_size=BATCH_SIZE,
+                  batches_per_prediction=NUMBER_OF_BATCHES_PER_PREDICTION, progress_callback=None):
+    """
+    Super-resolves a whole low-res signal with non-overlapping LOW_RESOLUTION_DIMENSION chunks. The chunks are
+    fed to the model in blocks of batches_per_prediction batches and written straight into a preallocated output
+    buffer; only the last batch is zero-padded. Returns the float32 high-res signal, RESAMPLING_FACTOR times as
+    long as the input. progress_callback(chunks_done, total_chunks) is called after every block.
+    """
+    downsampled_array = np.ascontiguousarray(downsampled_array).reshape(-1)
+    output_length = len(downsampled_array) * RESAMPLING_FACTOR
+    samples_per_batch = batch_size * LOW_RESOLUTION_DIMENSION
+    number_of_full_batches = len(downsampled_array) // samples_per_batch
+    number_of_batches = -(-len(downsampled_array) // samples_per_batch)
+    output = np.empty(number_of_batches * batch_size * SAMPLE_DIMENSION, dtype=np.float32)
+
+    chunks = frame_signal(downsampled_array[:number_of_full_batches * samples_per_batch])
+    chunks_per_prediction = batch_size * batches_per_prediction
+    total_chunks = -(-len(downsampled_array) // LOW_RESOLUTION_DIMENSION)
+    for chunk_index in range(0, len(chunks), chunks_per_prediction):
+        input_block = chunks[chunk_index:chunk_index + chunks_per_prediction].astype(np.float32)
+        prediction = model.predict(input_block, batch_size=batch_size, verbose=0)
+        output[chunk_index * SAMPLE_DIMENSION:(chunk_index + len(input_block)) * SAMPLE_DIMENSION] = \
+            prediction.reshape(-1)
+        if progress_callback is not None:
+            progress_callback(chunk_index + len(input_block), total_chunks)
+
+    if number_of_batches > number_of_full_batches:
+        remainder = downsampled_array[number_of_full_batches * samples_per_batch:]
+        last_batch = np.zeros((batch_size, LOW_RESOLUTION_DIMENSION, 1), dtype=np.float32)
+        last_batch.reshape(-1)[:len(remainder)] = remainder
+        prediction = model.predict(last_batch, batch_size=batch_size, verbose=0)
+        output[number_of_full_batches * batch_size * SAMPLE_DIMENSION:] = prediction.reshape(-1)
+        if progress_callback is not None:
+            progress_callback(total_chunks, total_chunks)
+
+    return output[:output_length]
+
+
+def super_resolve_in_one_pass(model, downsampled_array, length_multiple=MODEL_LENGTH_MULTIPLE):
+    """
+    Super-resolves a whole low-res signal in a single forward pass of a dynamic-shape model (see
+    model.create_dynamic_model), without chunking or stitching. The signal is zero-padded to a multiple of
+    length_multiple and the padding is cut off the output.
+    """
+    downsampled_array = np.asarray(downsampled_array, dtype=np.float32).reshape(-1)
+    padded_length = -(-len(downsampled_array) // length_multiple) * length_multiple
+    model_input = np.zeros((1, padded_length, 1), dtype=np.float32)
+    model_input[0, :len(downsampled_array), 0] = downsampled_array
+    output = np.asarray(model(model_input, training=False)).reshape(-1)
+    return output[:len(downsampled_array) * RESAMPLING_FACTOR]
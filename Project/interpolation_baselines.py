@@ -0,0 +1,77 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import numpy as np
+from scipy import interpolate
+from constants import *
+from numpy_metrics import signal_to_noise_ratio, root_mean_squared_error
+
+
+@lru_cache(maxsize=None)
+def create_cubic_spline_interpolation_matrix(low_resolution_length=LOW_RESOLUTION_DIMENSION,
+                                             resampling_factor=RESAMPLING_FACTOR):
+    """
+    The interpolating cubic spline of DatasetGenerator.upsample is linear in the low-res samples because its knot
+    grid never changes, so it can be precomputed as a (low_resolution_length, high_resolution_length) matrix whose
+    rows are the splines through the unit impulses.
+    """
+    high_resolution_length = low_resolution_length * resampling_factor
+    knots = np.arange(high_resolution_length, step=resampling_factor)
+    high_resolution_range = np.arange(high_resolution_length)
+
+    interpolation_matrix = np.empty((low_resolution_length, high_resolution_length), dtype=np.float32)
+    for sample_index, impulse in enumerate(np.eye(low_resolution_length)):
+        spline = interpolate.splrep(knots, impulse)
+        interpolation_matrix[sample_index] = interpolate.splev(high_resolution_range, spline)
+    return interpolation_matrix
+
+
+@lru_cache(maxsize=None)
+def create_linear_interpolation_matrix(low_resolution_length=LOW_RESOLUTION_DIMENSION,
+                                       resampling_factor=RESAMPLING_FACTOR):
+    """
+    Matrix form of DatasetGenerator.linear_upsample, which stretches the low-res samples over the high-res length.
+    """
+    high_resolution_length = low_resolution_length * resampling_factor
+    positions = np.linspace(0, low_resolution_length - 1, num=high_resolution_length)
+    left_indices = np.minimum(np.floor(positions).astype(np.int64), low_resolution_length - 2)
+    right_weights = positions - left_indices
+
+    interpolation_matrix = np.zeros((low_resolution_length, high_resolution_length), dtype=np.float32)
+    columns = np.arange(high_resolution_length)
+    interpolation_matrix[left_indices, columns] = 1 - right_weights
+    interpolation_matrix[left_indices + 1, columns] = right_weights
+    return interpolation_matrix
+
+
+def upsample_batch(low_resolution_batch, interpolation_matrix, number_of_workers=1, block_size=BASELINE_BLOCK_SIZE):
+    """
+    Upsamples a (N, low_resolution_length[, 1]) batch in one matrix product per block of block_size rows. The blocks
+    are spread over number_of_workers threads (NumPy releases the GIL during the product).
+    """
+    low_resolution_batch = np.asarray(low_resolution_batch).reshape(len(low_resolution_batch), -1)
+    output = np.empty((len(low_resolution_batch), interpolation_matrix.shape[1]), dtype=np.float32)
+
+    def upsample_block(block_start):
+        block = low_resolution_batch[block_start:block_start + block_size].astype(np.float32)
+        np.matmul(block, interpolation_matrix, out=output[block_start:block_start + len(block)])
+
+    block_starts = range(0, len(low_resolution_batch), block_size)
+    if number_of_workers > 1:
+        with ThreadPoolExecutor(max_workers=number_of_workers) as executor:
+            list(executor.map(upsample_block, block_starts))
+    else:
+        for block_start in block_starts:
+            upsample_block(block_start)
+    return output
+
+
+def evaluate_baseline(interpolation_matrix, low_resolution_batch, high_resolution_batch, number_of_workers=1):
+    """
+    Returns the mean per-example SNR and RMSE of an interpolation baseline over a batch of low-res/high-res pairs.
+    """
+    high_resolution_batch = np.asarray(high_resolution_batch).reshape(len(high_resolution_batch), -1)
+    baseline_batch = upsample_batch(low_resolution_batch, interpolation_matrix, number_of_workers)
+    return {
+        "signal_to_noise_ratio": float(np.mean(signal_to_noise_ratio(high_resolution_batch, baseline_batch))),
+        "root_mean_squared_error": float(np.mean(root_mean_squared_error(high_resolution_batch, baseline_batch)))
+    }
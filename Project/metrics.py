@@ -1,7 +1,7 @@
 from tensorflow.keras import backend as K
 import tensorflow as tf
-from sklearn.metrics import mean_squared_error
 from constants import *
+from DatasetStatistics import DatasetStatistics
 
 
 def signal_to_noise_ratio(actual_signal, predicted_signal):
@@ -22,17 +22,17 @@ def normalised_root_mean_squared_error(actual_signal, predicted_signal, interqua
 
 def normalised_root_mean_squared_error_training(actual_signal, predicted_signal):
     return normalised_root_mean_squared_error(actual_signal, predicted_signal,
-                                              TRAINING_SET_THIRD_QUANTILE - TRAINING_SET_FIRST_QUANTILE)
+                                              DatasetStatistics.get_interquartile_ranges()["training"])
 
 
 def normalised_root_mean_squared_error_validation(actual_signal, predicted_signal):
     return normalised_root_mean_squared_error(actual_signal, predicted_signal,
-                                              VALIDATION_SET_THIRD_QUANTILE - VALIDATION_SET_FIRST_QUANTILE)
+                                              DatasetStatistics.get_interquartile_ranges()["validation"])
 
 
 def normalised_root_mean_squared_error_testing(actual_signal, predicted_signal):
     return normalised_root_mean_squared_error(actual_signal, predicted_signal,
-                                              TESTING_SET_THIRD_QUANTILE - TESTING_SET_FIRST_QUANTILE)
+                                              DatasetStatistics.get_interquartile_ranges()["testing"])
 
 
 def normalised_root_mean_squared_error_for_single_examples(actual_signal, predicted_signal, option):
@@ -8,14 +8,15 @@ from constants import *
 
 def subpixel1d(input_shape, r):
     def _phase_shift(I, r=2):
-        X = tf.transpose(I)
-        X = tf.batch_to_space(X, [r], [[0, 0]])
-        X = tf.transpose(X)
-        return X
+        # Same result as transposing the tensor, applying tf.batch_to_space with block r on the channel axis and
+        # transposing back, but it never touches the batch axis, so the batch and length can stay unknown:
+        # output[b, l * r + i, c] = I[b, l, i * (C / r) + c]
+        input_shape = tf.shape(I)
+        return tf.reshape(I, [input_shape[0], input_shape[1] * r, I.shape[2] // r])
 
     def subpixel_shape(input_shape):
         dims = [input_shape[0],
-                input_shape[1] * r,
+                input_shape[1] * r if input_shape[1] is not None else None,
                 int(input_shape[2] / r)]
         output_shape = tuple(dims)
         return output_shape
@@ -44,7 +45,11 @@ def create_upsampling_block(x, filters, kernel_size, padding='same', stride=1, c
     return x
 
 
-def create_model(batch_size=BATCH_SIZE, input_size=SAMPLE_DIMENSION // RESAMPLING_FACTOR):
+def create_model(batch_size=BATCH_SIZE, input_size=SAMPLE_DIMENSION // RESAMPLING_FACTOR, plot=True):
+    """
+    batch_size and input_size may be None: the network is fully convolutional, so the same layers (and the same .h5
+    weights) accept any batch of inputs whose length is a multiple of MODEL_LENGTH_MULTIPLE.
+    """
     x = Input((input_size, 1), batch_size=batch_size)
     x_input = x
     downsampling_blocks = []
@@ -81,6 +86,13 @@ def create_model(batch_size=BATCH_SIZE, input_size=SAMPLE_DIMENSION // RESAMPLIN
     x = Conv1D(filters=1, kernel_initializer='Orthogonal', kernel_size=1)(x)
 
     model = Model(x_input, x)
-    plot_model(model, to_file="model_stage_" + str(STAGE) + ".png", show_shapes=True, show_layer_names=True)
+    if plot:
+        plot_model(model, to_file="model_stage_" + str(STAGE) + ".png", show_shapes=True, show_layer_names=True)
     return model
 
+
+def create_dynamic_model(weights_path=None):
+    model = create_model(batch_size=None, input_size=None, plot=False)
+    if weights_path is not None:
+        model.load_weights(weights_path)
+    return model
@@ -0,0 +1,64 @@
+import numpy as np
+from constants import *
+from DatasetStatistics import DatasetStatistics
+
+# NumPy counterparts of the metrics in metrics.py, for evaluation and reporting code that does not need TensorFlow.
+# Every function takes a single example or a batch of examples, shaped (length,), (N, length) or (N, length, 1),
+# and returns one value per example, computed over the samples of that example.
+
+
+def as_examples(signal):
+    signal = np.asarray(signal)
+    if signal.ndim == 3 and signal.shape[-1] == 1:
+        signal = signal.reshape(signal.shape[:2])
+    return signal
+
+
+def mean_squared_error(actual_signal, predicted_signal):
+    actual_signal, predicted_signal = as_examples(actual_signal), as_examples(predicted_signal)
+    error = np.subtract(predicted_signal, actual_signal, dtype=np.float64)
+    return np.einsum("...i,...i->...", error, error) / error.shape[-1]
+
+
+def signal_to_noise_ratio(actual_signal, predicted_signal):
+    actual_signal = as_examples(actual_signal).astype(np.float64)
+    noise_power = np.sqrt(mean_squared_error(actual_signal, predicted_signal))
+    signal_power = np.sqrt(np.einsum("...i,...i->...", actual_signal, actual_signal) / actual_signal.shape[-1])
+    return 10 * np.log(signal_power / noise_power)
+
+
+def root_mean_squared_error(actual_signal, predicted_signal):
+    return np.sqrt(mean_squared_error(actual_signal, predicted_signal))
+
+
+def normalised_root_mean_squared_error(actual_signal, predicted_signal, interquartile_range):
+    return root_mean_squared_error(actual_signal, predicted_signal) / interquartile_range
+
+
+def normalised_root_mean_squared_error_training(actual_signal, predicted_signal):
+    return normalised_root_mean_squared_error(actual_signal, predicted_signal,
+                                              DatasetStatistics.get_interquartile_ranges()["training"])
+
+
+def normalised_root_mean_squared_error_validation(actual_signal, predicted_signal):
+    return normalised_root_mean_squared_error(actual_signal, predicted_signal,
+                                              DatasetStatistics.get_interquartile_ranges()["validation"])
+
+
+def normalised_root_mean_squared_error_testing(actual_signal, predicted_signal):
+    return normalised_root_mean_squared_error(actual_signal, predicted_signal,
+                                              DatasetStatistics.get_interquartile_ranges()["testing"])
+
+
+def normalised_root_mean_squared_error_for_single_examples(actual_signal, predicted_signal, option):
+    actual_signal = as_examples(actual_signal)
+    root_mean_squared_error_value = root_mean_squared_error(actual_signal, predicted_signal)
+    if option == "mean":
+        return root_mean_squared_error_value / np.mean(actual_signal, axis=-1)
+    elif option == "sd":
+        return root_mean_squared_error_value / np.std(actual_signal, axis=-1)
+    elif option == "range":
+        maximum_value = np.max(actual_signal, axis=-1).astype(np.float64)
+        minimum_value = np.min(actual_signal, axis=-1).astype(np.float64)
+        return root_mean_squared_error_value / (maximum_value - minimum_value)
+    raise Exception("Unexpected option parameter.")
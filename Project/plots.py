@@ -1,10 +1,11 @@
 from model import create_model
 from constants import *
-import tensorflow_datasets as tfds
+from WaveformCorpus import WaveformCorpus
 import tensorflow as tf
 from DatasetGenerator import DatasetGenerator
 import numpy as np
 from metrics import *
+import numpy_metrics
 import matplotlib.pyplot as plt
 import random
 from tensorflow.python.ops.numpy_ops import np_config
@@ -16,21 +17,14 @@ model.compile(loss="mean_squared_error", optimizer='Adam',
               metrics=[normalised_root_mean_squared_error])
 model.load_weights(MODEL_PATH)
 
-print("Loading the sample vocal recording from the VCTK dataset...")
-dataset = tfds.load("vctk", with_info=False)
-sample_array = None
-transcript = None
-recording_index = 0
+print("Loading the sample vocal recording from the VCTK index...")
+vctk_corpus = WaveformCorpus(VCTK_CORPUS_DIRECTORY)
 
 chosen_recording = AMOUNT_OF_TRACKS_USED_FOR_DATA_GENERATION + 100
 
-for sample in dataset['train']:
-    if recording_index == chosen_recording:
-        transcript = sample['text']
-        print("Recording transcript: {}".format(transcript))
-        sample_array = np.array(sample['speech'], dtype=float)
-        break
-    recording_index += 1
+transcript = vctk_corpus.get_transcript(chosen_recording)
+print("Recording transcript: {}".format(transcript))
+sample_array = vctk_corpus.get_track(chosen_recording)
 
 sample_array_length = len(sample_array)
 sample_array = sample_array[:sample_array_length - (sample_array_length % RESAMPLING_FACTOR)]
@@ -43,7 +37,7 @@ high_res_chunks = []
 for batch_index in range(0, BATCH_SIZE):
     high_res_chunk = sample_array[start_index:start_index + SAMPLE_DIMENSION]
     low_res_chunk = np.array(high_res_chunk[0::RESAMPLING_FACTOR])
-    low_res_chunk = tf.constant(low_res_chunk, dtype=float)
+    low_res_chunk = tf.constant(low_res_chunk, dtype=tf.float32)
     high_res_chunks.append(high_res_chunk)
     batch_used_for_prediction.append(low_res_chunk)
 
@@ -64,8 +58,8 @@ axes[3].plot(interpolated_chunk)
 high_res_chunk = high_res_chunks[random_batch_index].astype(np.float32)
 super_res_chunk = np.array(result[random_batch_index]).reshape(result[random_batch_index].shape[0]).astype(np.float32)
 
-nrmse_high_res_super_res = normalised_root_mean_squared_error_for_single_examples(high_res_chunk, super_res_chunk, "range").numpy()
-nrmse_high_res_interpolated = normalised_root_mean_squared_error_for_single_examples(high_res_chunk, interpolated_chunk, "range").numpy()
+nrmse_high_res_super_res = numpy_metrics.normalised_root_mean_squared_error_for_single_examples(high_res_chunk, super_res_chunk, "range")
+nrmse_high_res_interpolated = numpy_metrics.normalised_root_mean_squared_error_for_single_examples(high_res_chunk, interpolated_chunk, "range")
 print(nrmse_high_res_super_res)
 print(nrmse_high_res_interpolated)
 figure.tight_layout()
@@ -86,8 +80,8 @@ axes[3].plot(interpolated_chunk[0:100])
 part_of_the_high_res_chunk = high_res_chunks[random_batch_index][0:100].astype(np.float32)
 part_of_the_super_res_chunk = np.array(result[random_batch_index][0:100]).reshape(result[random_batch_index][0:100].shape[0]).astype(np.float32)
 part_of_the_interpolated_chunk = interpolated_chunk[0:100].astype(np.float32)
-nrmse_parts_of_the_chunk_high_res_super_res = normalised_root_mean_squared_error_for_single_examples(part_of_the_high_res_chunk, part_of_the_super_res_chunk, "range")
-nrmse_parts_of_the_chunk_high_res_interpolated = normalised_root_mean_squared_error_for_single_examples(part_of_the_high_res_chunk, part_of_the_interpolated_chunk, "range")
+nrmse_parts_of_the_chunk_high_res_super_res = numpy_metrics.normalised_root_mean_squared_error_for_single_examples(part_of_the_high_res_chunk, part_of_the_super_res_chunk, "range")
+nrmse_parts_of_the_chunk_high_res_interpolated = numpy_metrics.normalised_root_mean_squared_error_for_single_examples(part_of_the_high_res_chunk, part_of_the_interpolated_chunk, "range")
 figure.tight_layout()
 figure.suptitle("Model result for a small part of a chunk (High-res/Super-res NRMSE={:.4f}, High-res/Interpolated NRMSE={:.4f})".format(nrmse_parts_of_the_chunk_high_res_super_res, nrmse_parts_of_the_chunk_high_res_interpolated))
 plt.subplots_adjust(top=0.9)
@@ -1,8 +1,11 @@
 from model import create_model
+from ModelRegistry import ModelRegistry
 from constants import *
-import tensorflow_datasets as tfds
+from WaveformCorpus import WaveformCorpus
 import tensorflow as tf
 from DatasetGenerator import DatasetGenerator
+from inference import downsample, super_resolve
+from audio_io import encode_wav
 import numpy as np
 from metrics import *
 import librosa
@@ -15,79 +18,32 @@ import re
 
 print("Loading and compiling model...")
 model = create_model()
-model.compile(loss="mean_squared_error", optimizer='Adam',
-              metrics=[signal_to_noise_ratio, normalised_root_mean_squared_error],
-              run_eagerly=True)
 model.load_weights(MODEL_PATH)
+model = ModelRegistry.create_inference_backend(model, INFERENCE_BACKEND)
 
-print("Loading the sample vocal recording from the VCTK dataset...")
-dataset = tfds.load("vctk", with_info=False)
-sample_array = None
-transcript = None
-recording_index = 0
+print("Loading the sample vocal recording from the VCTK index...")
+vctk_corpus = WaveformCorpus(VCTK_CORPUS_DIRECTORY)
 
 chosen_recording = AMOUNT_OF_TRACKS_USED_FOR_DATA_GENERATION + 100
 
-for sample in dataset['train']:
-    if recording_index == chosen_recording:
-        transcript = sample['text']
-        print("Recording transcript: {}".format(transcript))
-        sample_array = np.array(sample['speech'], dtype=float)
-        break
-    recording_index += 1
+transcript = vctk_corpus.get_transcript(chosen_recording)
+print("Recording transcript: {}".format(transcript))
+sample_array = vctk_corpus.get_track(chosen_recording)
 
 print("Downsampling the audio...")
-
-sample_array_length = len(sample_array)
-sample_array = sample_array[:sample_array_length - (sample_array_length % RESAMPLING_FACTOR)]
-downsampled_array = np.array(sample_array[0::RESAMPLING_FACTOR])
-
-downsampled_array = np.reshape(downsampled_array, (len(downsampled_array), 1))
-sample_array = np.reshape(sample_array, (len(sample_array), 1))
+sample_array, downsampled_array = downsample(sample_array)
 
 print("Sample array length: {}".format(len(sample_array)))
 print("Downsampled array length: {}".format(len(downsampled_array)))
-
-super_resolution_output_chunks = []
-
-print("Cutting chunks from the downsampled audio (length={}) and feeding batches to the model...".format(len(downsampled_array)))
-
-for sample_index in range(0, len(downsampled_array), LOW_RESOLUTION_DIMENSION * BATCH_SIZE):
-    print("> Sample index {}".format(sample_index))
-    input_batch = []
-
-    for batch_sample_index in range(0, BATCH_SIZE):
-        print("--- Batch sample index {}".format(batch_sample_index))
-        if sample_index + (batch_sample_index + 1) * LOW_RESOLUTION_DIMENSION >= len(downsampled_array):
-            chunk = downsampled_array[sample_index + batch_sample_index * LOW_RESOLUTION_DIMENSION:]
-            zeroes_to_add = SAMPLE_DIMENSION // RESAMPLING_FACTOR - len(chunk)
-            array_of_zeroes = np.zeros(zeroes_to_add)
-            chunk = np.append(chunk, array_of_zeroes)
-            chunk = chunk.reshape((chunk.shape[0], 1))
-            print("Chunk shape (1):")
-            print(chunk.shape)
-        else:
-            chunk = downsampled_array[sample_index + batch_sample_index * LOW_RESOLUTION_DIMENSION:
-                                      sample_index + (batch_sample_index + 1) * LOW_RESOLUTION_DIMENSION]
-            print("Chunk shape (2):")
-            print(chunk.shape)
-        print(chunk)
-        input_batch.append(chunk)
-
-    print("> Feeding the low-res batch to the model...")
-    prediction = model.predict(np.array(input_batch))
-    super_resolution_output_chunks.append(prediction.reshape((prediction.shape[0]*prediction.shape[1])))
-    print("Prediction done. Output has been appended to the result.")
-
-output = np.array([element for sublist in super_resolution_output_chunks for element in sublist])
-print(output)
+print("Feeding the downsampled audio (length={}) to the model...".format(len(downsampled_array)))
+output = super_resolve(model, downsampled_array)
 print("Output shape: {}".format(output.shape))
-output = output[:sample_array.size]
 
-downsampled_array = downsampled_array.reshape(downsampled_array.shape[0])
-sample_array = sample_array.reshape(sample_array.shape[0])
-low_resolution_signal_spectrogram = librosa.feature.melspectrogram(y=downsampled_array, sr=DOWNSAMPLED_RATE)
-high_resolution_signal_spectrogram = librosa.feature.melspectrogram(y=sample_array, sr=VCTK_DATASET_SAMPLING_RATE)
+# librosa only works on floating-point signals; the int16 recordings are converted for the spectrograms alone.
+low_resolution_signal_spectrogram = librosa.feature.melspectrogram(y=downsampled_array.astype(np.float32),
+                                                                   sr=DOWNSAMPLED_RATE)
+high_resolution_signal_spectrogram = librosa.feature.melspectrogram(y=sample_array.astype(np.float32),
+                                                                    sr=VCTK_DATASET_SAMPLING_RATE)
 super_resolution_signal_spectrogram = librosa.feature.melspectrogram(y=output, sr=VCTK_DATASET_SAMPLING_RATE)
 
 print("Computed the spectrograms.")
@@ -111,7 +67,8 @@ fig.colorbar(third_subplot_spectrogram, ax=[ax[0], ax[1], ax[2]], format='%+2.0f
 plt.savefig("outputs/spectrograms-track-{}-transcript-{}.png".format(chosen_recording, transcript))
 plt.show()
 
-sf.write("outputs/track-no-{}-high-res.wav".format(chosen_recording), np.int16(sample_array), VCTK_DATASET_SAMPLING_RATE)
-sf.write("outputs/track-no-{}-low-res.wav".format(chosen_recording), np.int16(downsampled_array), DOWNSAMPLED_RATE)
-sf.write("outputs/track-no-{}-super-res.wav".format(chosen_recording), np.int16(output.reshape(output.shape)), VCTK_DATASET_SAMPLING_RATE)
+sf.write("outputs/track-no-{}-high-res.wav".format(chosen_recording), sample_array, VCTK_DATASET_SAMPLING_RATE)
+sf.write("outputs/track-no-{}-low-res.wav".format(chosen_recording), downsampled_array, DOWNSAMPLED_RATE)
+with open("outputs/track-no-{}-super-res.wav".format(chosen_recording), "wb") as super_resolution_file:
+    super_resolution_file.write(encode_wav(output, VCTK_DATASET_SAMPLING_RATE))
 
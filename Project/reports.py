@@ -0,0 +1,60 @@
+import io
+from functools import lru_cache
+import numpy as np
+import matplotlib
+matplotlib.use("Agg")
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import librosa
+import librosa.display
+from constants import *
+
+
+@lru_cache(maxsize=None)
+def get_mel_filterbank(sample_rate, number_of_fft_points=SPECTROGRAM_NUMBER_OF_FFT_POINTS):
+    """
+    The mel filterbank depends only on the sample rate and the FFT size, so it is built once per sample rate
+    instead of once per spectrogram.
+    """
+    return librosa.filters.mel(sr=sample_rate, n_fft=number_of_fft_points)
+
+
+def compute_mel_spectrogram(signal, sample_rate, number_of_fft_points=SPECTROGRAM_NUMBER_OF_FFT_POINTS):
+    """
+    Same power mel spectrogram as librosa.feature.melspectrogram with its default parameters.
+    """
+    signal = np.asarray(signal, dtype=np.float32).reshape(-1)
+    power_spectrogram = np.abs(librosa.stft(signal, n_fft=number_of_fft_points)) ** 2
+    return get_mel_filterbank(sample_rate, number_of_fft_points) @ power_spectrogram
+
+
+def render_spectrograms(downsampled_array, sample_array, output):
+    """
+    Plots the mel spectrograms of the low-res, high-res and super-res signals one under another and returns the
+    figure as PNG bytes. The figure is drawn on its own Agg canvas, without pyplot, so reports can be rendered from
+    worker threads.
+    """
+    low_resolution_signal_spectrogram = compute_mel_spectrogram(downsampled_array, DOWNSAMPLED_RATE)
+    high_resolution_signal_spectrogram = compute_mel_spectrogram(sample_array, VCTK_DATASET_SAMPLING_RATE)
+    super_resolution_signal_spectrogram = compute_mel_spectrogram(output, VCTK_DATASET_SAMPLING_RATE)
+
+    fig = Figure(figsize=(10, 10))
+    FigureCanvasAgg(fig)
+    ax = fig.subplots(3, 1)
+    low_res_decibel_units = librosa.power_to_db(low_resolution_signal_spectrogram, ref=np.max)
+    high_res_decibel_units = librosa.power_to_db(high_resolution_signal_spectrogram, ref=np.max)
+    super_res_decibel_units = librosa.power_to_db(super_resolution_signal_spectrogram, ref=np.max)
+    ax[0].set_title("Low-res ({} samples)".format(len(downsampled_array)))
+    librosa.display.specshow(low_res_decibel_units, x_axis='time', y_axis='mel', sr=DOWNSAMPLED_RATE, ax=ax[0])
+    ax[1].set_title("High-res ({} samples)".format(len(sample_array)))
+    librosa.display.specshow(high_res_decibel_units, x_axis='time', y_axis='mel', sr=VCTK_DATASET_SAMPLING_RATE,
+                             ax=ax[1])
+    ax[2].set_title("Super-res ({} samples)".format(len(output)))
+    third_subplot_spectrogram = librosa.display.specshow(super_res_decibel_units, x_axis='time', y_axis='mel',
+                                                         sr=VCTK_DATASET_SAMPLING_RATE, ax=ax[2])
+
+    fig.tight_layout()
+    fig.colorbar(third_subplot_spectrogram, ax=[ax[0], ax[1], ax[2]], format='%+2.0f dB')
+    png_buffer = io.BytesIO()
+    fig.savefig(png_buffer, format="png")
+    return png_buffer.getvalue()
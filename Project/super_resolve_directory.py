@@ -0,0 +1,138 @@
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import soundfile as sf
+from ModelRegistry import ModelRegistry
+from MicroBatchScheduler import MicroBatchScheduler
+from inference import downsample, super_resolve
+from audio_io import encode_wav
+from constants import *
+
+
+def find_audio_files(input_path):
+    """
+    Returns (path, path relative to the output directory) pairs for every audio file under a directory, or for every
+    path listed in a manifest, one per line, relative to the directory of the manifest unless absolute. Files outside
+    of the manifest directory keep their whole absolute path, without its root, under the output directory.
+    """
+    if os.path.isdir(input_path):
+        audio_files = []
+        for directory, _, filenames in os.walk(input_path):
+            for filename in sorted(filenames):
+                if filename.lower().endswith(BATCH_AUDIO_EXTENSIONS):
+                    path = os.path.join(directory, filename)
+                    audio_files.append((path, os.path.relpath(path, input_path)))
+        return sorted(audio_files)
+
+    manifest_directory = os.path.dirname(os.path.abspath(input_path))
+    with open(input_path) as manifest_file:
+        paths = [line.strip() for line in manifest_file if line.strip() != ""]
+    audio_files = []
+    for path in dict.fromkeys(os.path.normpath(os.path.join(manifest_directory, path)) for path in paths):
+        relative_path = os.path.relpath(path, manifest_directory)
+        if relative_path.startswith(".."):
+            relative_path = os.path.splitdrive(path)[1].lstrip(os.sep)
+        audio_files.append((path, relative_path))
+    return audio_files
+
+
+def find_conflicting_outputs(audio_files):
+    """
+    Returns the input files that would be written to the same output (e.g. x.wav and x.flac), grouped by output.
+    """
+    inputs_by_output = {}
+    for path, relative_path in audio_files:
+        inputs_by_output.setdefault(get_output_path("", relative_path), []).append(path)
+    return [paths for paths in inputs_by_output.values() if len(paths) > 1]
+
+
+def get_output_path(output_directory, relative_path):
+    return os.path.join(output_directory, os.path.splitext(relative_path)[0] + ".wav")
+
+
+def read_low_resolution_signal(path):
+    """
+    Reads the first channel of a WAV or FLAC file as int16. Low-res files (DOWNSAMPLED_RATE) are returned as they
+    are; full-rate files are downsampled the same way as the training pairs, like the uploads of the app.
+    """
+    sample_array, sample_rate = sf.read(path, dtype="int16", always_2d=True)
+    sample_array = sample_array[:, 0]
+    if sample_rate == DOWNSAMPLED_RATE:
+        return sample_array
+    if sample_rate == VCTK_DATASET_SAMPLING_RATE:
+        return downsample(sample_array)[1]
+    raise ValueError("Unsupported sample rate {} Hz, expected {} or {} Hz.".format(
+        sample_rate, DOWNSAMPLED_RATE, VCTK_DATASET_SAMPLING_RATE))
+
+
+def super_resolve_file(model, path, output_path):
+    """
+    Decodes, super-resolves and writes one file. The WAV is written next to its destination and renamed into place,
+    so an interrupted run never leaves a truncated output that a resumed run would skip. Returns the duration of
+    the file in seconds.
+    """
+    downsampled_array = read_low_resolution_signal(path)
+    output = super_resolve(model, downsampled_array, batch_size=1)
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    temporary_path = output_path + ".part"
+    with open(temporary_path, "wb") as output_file:
+        output_file.write(encode_wav(output, VCTK_DATASET_SAMPLING_RATE))
+    os.replace(temporary_path, output_path)
+    return len(downsampled_array) / DOWNSAMPLED_RATE
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Super-resolves every WAV/FLAC file of a directory or a manifest.")
+    parser.add_argument("input", help="directory to walk, or text file listing one audio file per line")
+    parser.add_argument("output_directory", help="where the 48 kHz WAVs are written, mirroring the input layout")
+    parser.add_argument("--weights", default=None,
+                        help="MODEL_PATH, or the exported .tflite model with a TFLite backend, by default")
+    parser.add_argument("--backend", default=INFERENCE_BACKEND)
+    parser.add_argument("--workers", type=int, default=BATCH_NUMBER_OF_WORKERS,
+                        help="files decoded, super-resolved and written at once")
+    parser.add_argument("--overwrite", action="store_true", help="process the files whose output already exists")
+    arguments = parser.parse_args()
+
+    audio_files = find_audio_files(arguments.input)
+    conflicting_outputs = find_conflicting_outputs(audio_files)
+    if len(conflicting_outputs) > 0:
+        for paths in conflicting_outputs:
+            print("Same output for: {}".format(", ".join(paths)))
+        raise SystemExit("Rename or remove the files above, their outputs would overwrite each other.")
+    pending_files = [(path, get_output_path(arguments.output_directory, relative_path))
+                     for path, relative_path in audio_files]
+    if not arguments.overwrite:
+        pending_files = [(path, output_path) for path, output_path in pending_files if not os.path.exists(output_path)]
+    print("Found {} files, {} already processed.".format(len(audio_files), len(audio_files) - len(pending_files)))
+    if len(pending_files) == 0:
+        raise SystemExit(0)
+
+    # The weights are loaded once, without the watcher thread, so they cannot be hot-swapped in the middle of a run.
+    model_registry = ModelRegistry(arguments.weights, inference_backend=arguments.backend)
+    model_registry.load()
+    # Every worker feeds the same scheduler, which fills the batches with the chunks of several files at once.
+    micro_batch_scheduler = MicroBatchScheduler(model_registry)
+    micro_batch_scheduler.start()
+
+    total_duration, number_of_failures = 0.0, 0
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=arguments.workers) as executor:
+        futures = {executor.submit(super_resolve_file, micro_batch_scheduler, path, output_path): path
+                   for path, output_path in pending_files}
+        for file_index, future in enumerate(as_completed(futures), start=1):
+            try:
+                duration = future.result()
+            except Exception as exception:
+                number_of_failures += 1
+                print("[{}/{}] {}: failed ({})".format(file_index, len(pending_files), futures[future], exception))
+                continue
+            total_duration += duration
+            print("[{}/{}] {}: {:.1f} s of audio".format(file_index, len(pending_files), futures[future], duration))
+    wall_time = time.perf_counter() - start_time
+    micro_batch_scheduler.stop()
+
+    print("Super-resolved {} files ({} failed): {:.1f} s of audio in {:.1f} s, {:.2f} audio-seconds per second.".format(
+        len(pending_files) - number_of_failures, number_of_failures, total_duration, wall_time,
+        total_duration / wall_time))
+    print("Scheduler: {}".format(micro_batch_scheduler.status()))
@@ -6,14 +6,12 @@ from metrics import *
 from tensorflow.keras.models import load_model
 from model import create_model
 
-_, _, (input_test_files, target_test_files) = DatasetGenerator.split_list_of_files()
-input_test_data, target_test_data = [], []
+dataset = DatasetGenerator.open_dataset()
+_, _, (testing_start, _) = DatasetGenerator.split_records()
 
-number_of_testing_batches = int(NUMBER_OF_TESTING_TENSORS / BATCH_SIZE)
-for index in range(0, number_of_testing_batches*BATCH_SIZE):
-    input_test_data.append(np.load("preprocessed_dataset/low_res/" + input_test_files[index]))
-    target_test_data.append(np.load("preprocessed_dataset/high_res/" + target_test_files[index]))
-    print("Loaded testing sample {}".format(index))
+number_of_testing_batches = int(get_number_of_testing_tensors() / BATCH_SIZE)
+input_test_data, target_test_data, _ = dataset.read(testing_start, testing_start + number_of_testing_batches*BATCH_SIZE)
+print("Read {} testing samples".format(len(input_test_data)))
 
 model = create_model()
 model.load_weights(MODEL_PATH)
@@ -22,8 +20,8 @@ adam_optimizer = tf.keras.optimizers.Adam(learning_rate=LEARNING_RATE)
 model.compile(loss="mean_squared_error", optimizer=adam_optimizer,
               metrics=[signal_to_noise_ratio, root_mean_squared_error, normalised_root_mean_squared_error_testing])
 
-input_test_data = np.array(input_test_data)
-target_test_data = np.array(target_test_data)
+input_test_data = input_test_data.astype(np.float32)
+target_test_data = target_test_data.astype(np.float32)
 
 print("Input test data shape: {}".format(input_test_data.shape))
 print("Target test data shape: {}".format(target_test_data.shape))
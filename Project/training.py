@@ -11,43 +11,21 @@ import datetime
 model = create_model()
 model.summary()
 
-(input_data_files, target_data_files), (input_validation_files, target_validation_files), _ \
-    = DatasetGenerator.split_list_of_files()
-input_data, target_data, input_validation_data, target_validation_data = [], [], [], []
-
-print("Loading the .npy files...")
-
-print("Number of input data files: {}".format(len(input_data_files)))
-print("Number of target data files: {}".format(len(target_data_files)))
-number_of_input_batches = int(NUMBER_OF_TRAINING_TENSORS / BATCH_SIZE)
-for index in range(0, number_of_input_batches*BATCH_SIZE):
-    input_data.append(np.load("preprocessed_dataset/low_res/" + input_data_files[index]))
-    target_data.append(np.load("preprocessed_dataset/high_res/" + target_data_files[index]))
-    print("Loaded training sample {}".format(index))
-
-number_of_validation_batches = int(NUMBER_OF_VALIDATION_TENSORS / BATCH_SIZE)
-for index in range(0, number_of_validation_batches*BATCH_SIZE):
-    input_validation_data.append(np.load("preprocessed_dataset/low_res/" + input_validation_files[index]))
-    target_validation_data.append(np.load("preprocessed_dataset/high_res/" + target_validation_files[index]))
-    print("Loaded validation sample {}".format(index))
-
-print("Converting Python list to numpy array...")
-input_data = np.array(input_data)
-target_data = np.array(target_data)
-input_validation_data = np.array(input_validation_data)
-target_validation_data = np.array(target_validation_data)
-print("Done.")
-
-print("Some input tensor shape: {}".format(input_data[0].shape))
-print("Some target tensor shape: {}".format(target_data[0].shape))
-print("Input data: {}".format(input_data.shape))
-print("Target data: {}".format(target_data.shape))
-print("Input validation data: {}".format(input_validation_data.shape))
-print("Target validation data: {}".format(target_validation_data.shape))
-print("Number of input batches: {}".format(number_of_input_batches))
-print("Number of validation batches: {}".format(number_of_validation_batches))
-print("Number of input data files: {}".format(len(input_data_files)))
-print("Number of validation data files: {}".format(len(input_validation_files)))
+(training_start, training_end), (validation_start, validation_end), _ = DatasetGenerator.split_records()
+
+print("Building the input pipelines ({} pairs)...".format(PAIR_GENERATION_MODE))
+records = DatasetGenerator.open_dataset()
+# The on-the-fly pairs are cheap to derive again, caching them would only materialise the dataset a second time
+use_cache = PAIR_GENERATION_MODE != "on_the_fly"
+training_dataset = DatasetGenerator.create_input_pipeline(
+    training_start, training_end, shuffle=True, dataset=records,
+    cache_filename=INPUT_PIPELINE_CACHE_DIRECTORY + "training" if use_cache else None)
+validation_dataset = DatasetGenerator.create_input_pipeline(
+    validation_start, validation_end, shuffle=False, dataset=records,
+    cache_filename=INPUT_PIPELINE_CACHE_DIRECTORY + "validation" if use_cache else None)
+
+print("Number of input batches: {}".format(get_number_of_training_tensors() // BATCH_SIZE))
+print("Number of validation batches: {}".format(get_number_of_validation_tensors() // BATCH_SIZE))
 print("Training started...")
 
 start_time = datetime.datetime.now()
@@ -75,10 +53,9 @@ checkpoint_callback = ModelCheckpoint(filepath=CHECKPOINT_PATH,
                                       verbose=True,
                                       monitor='val_loss')
 
-history = model.fit(input_data, target_data,
-                    batch_size=BATCH_SIZE,
+history = model.fit(training_dataset,
                     epochs=NUMBER_OF_EPOCHS,
-                    validation_data=(input_validation_data, target_validation_data),
+                    validation_data=validation_dataset,
                     callbacks=[checkpoint_callback],
                     initial_epoch=latest_epoch,
                     verbose=True)
@@ -95,7 +72,7 @@ plot_title = "Resampling factor: " + str(RESAMPLING_FACTOR) \
              + "; Epochs: " + str(NUMBER_OF_EPOCHS) \
              + "; Batch size: " + str(BATCH_SIZE) \
              + "; Learning rate: " + str(LEARNING_RATE) \
-             + "; Data split: " + str(NUMBER_OF_TRAINING_TENSORS) + "/" + str(NUMBER_OF_VALIDATION_TENSORS) + "/" + str(NUMBER_OF_TESTING_TENSORS)
+             + "; Data split: " + str(get_number_of_training_tensors()) + "/" + str(get_number_of_validation_tensors()) + "/" + str(get_number_of_testing_tensors())
 plot_filename = plot_title.replace(" ", "_").replace(":", "").replace(";", "").replace("/", "_")
 
 loss_files = os.listdir("outputs/losses-as-numpy-arrays")
@@ -1,22 +1,22 @@
 import numpy as np
 import matplotlib.pyplot as plt
-import os
 import random
+from DatasetGenerator import DatasetGenerator
 
-low_resolution_files = np.sort(np.array(os.listdir("preprocessed_dataset/low_res")))
-high_resolution_files = np.sort(np.array(os.listdir("preprocessed_dataset/high_res")))
+dataset = DatasetGenerator.open_dataset()
 
-chosen_file_index = random.randint(0, len(low_resolution_files))
+chosen_record_index = random.randint(0, len(dataset) - 1)
 
-low_res_array = np.load("preprocessed_dataset/low_res/" + low_resolution_files[chosen_file_index])
-high_res_array = np.load("preprocessed_dataset/high_res/" + high_resolution_files[chosen_file_index])
+low_res_records, high_res_records, record_index = dataset.read(chosen_record_index, chosen_record_index + 1)
+record_title = "Record {} (track {}, sample index {})".format(chosen_record_index, record_index[0]["track"],
+                                                             record_index[0]["offset"])
 
 figure, axes = plt.subplots(2, 1, figsize=(10, 8))
 
-axes[0].set_title(low_resolution_files[chosen_file_index])
-axes[0].plot(low_res_array)
+axes[0].set_title("Low-res | " + record_title)
+axes[0].plot(low_res_records[0])
 
-axes[1].set_title(high_resolution_files[chosen_file_index])
-axes[1].plot(high_res_array)
+axes[1].set_title("High-res | " + record_title)
+axes[1].plot(high_res_records[0])
 
 plt.show()
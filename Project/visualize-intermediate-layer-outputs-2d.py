@@ -1,6 +1,6 @@
 from model import create_model
 from constants import *
-import tensorflow_datasets as tfds
+from WaveformCorpus import WaveformCorpus
 import tensorflow.keras.backend as K
 import numpy as np
 from metrics import *
@@ -23,24 +23,17 @@ model.compile(loss="mean_squared_error", optimizer='Adam',
 model.load_weights(MODEL_PATH)
 
 print("Model layers: {}".format(model.layers))
-print("Loading the sample vocal recording from the VCTK dataset...")
-dataset = tfds.load("vctk", with_info=False)
-sample_array = None
-transcript = None
-recording_index = 0
+print("Loading the sample vocal recording from the VCTK index...")
+vctk_corpus = WaveformCorpus(VCTK_CORPUS_DIRECTORY)
 
 if "layer-outputs" not in os.listdir("./"):
     os.mkdir("./layer-outputs")
 
 chosen_recording = random.randint(AMOUNT_OF_TRACKS_USED_FOR_DATA_GENERATION + 1, AMOUNT_OF_TRACKS_USED_FOR_DATA_GENERATION + 100)
 
-for sample in dataset['train']:
-    if recording_index == chosen_recording:
-        transcript = sample['text']
-        print("Recording transcript: {}".format(transcript))
-        sample_array = np.array(sample['speech'], dtype=float)
-        break
-    recording_index += 1
+transcript = vctk_corpus.get_transcript(chosen_recording)
+print("Recording transcript: {}".format(transcript))
+sample_array = vctk_corpus.get_track(chosen_recording)
 
 print("Downsampling the audio...")
 
@@ -52,7 +45,7 @@ low_resolution_chunk = high_resolution_chunk[::RESAMPLING_FACTOR]
 low_resolution_chunk = np.reshape(low_resolution_chunk, (len(low_resolution_chunk), 1))
 
 input_batch = BATCH_SIZE * [low_resolution_chunk]
-input_batch = tf.constant(input_batch)
+input_batch = tf.constant(input_batch, dtype=tf.float32)
 
 super_resolution_chunk = model.predict(input_batch)[0]
 